@@ -0,0 +1,94 @@
+"""FCPXMLParser 解析性能基准
+
+生成包含大量资源和片段的合成 FCPXML 文档，比较按 id 索引的解析与
+旧的逐资源 XPath 查找 + 线性扫描方式的耗时随规模的变化。
+
+用法:
+    python benchmarks/bench_fcpxml_parser.py
+    python benchmarks/bench_fcpxml_parser.py --sizes 1000 10000 --legacy-max 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import urllib.parse
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fcpxml_parser import FCPXMLParser
+
+
+def write_document(path: str, asset_count: int, markers_per_clip: int = 2):
+    """生成合成文档：每个资源一个 format、一个 asset 和一个带标记点的 asset-clip"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<fcpxml version="1.10">\n<resources>\n')
+        for i in range(asset_count):
+            f.write(f'<format id="f{i}" frameDuration="1001/30000s" width="1920" height="1080"/>\n')
+            f.write(f'<asset id="a{i}" start="0s" duration="600s" hasVideo="1" format="f{i}">'
+                    f'<media-rep kind="original-media" src="file:///media/clip_{i}.mov"/></asset>\n')
+        f.write('</resources>\n<library><event name="E"><project name="P">'
+                '<sequence format="f0"><spine>\n')
+        for i in range(asset_count):
+            f.write(f'<asset-clip ref="a{i}" offset="{i * 10}s" start="0s" duration="10s">')
+            for j in range(markers_per_clip):
+                f.write(f'<marker start="{j + 1}s" duration="1001/30000s" value="m{i}_{j}"/>')
+            f.write('</asset-clip>\n')
+        f.write('</spine></sequence></project></event></library>\n</fcpxml>\n')
+
+
+def legacy_parse(path: str) -> int:
+    """旧实现的查找方式：每个 asset 一次全树 XPath，每个片段一次线性扫描"""
+    root = ET.parse(path).getroot()
+    videos = []
+    for asset in root.findall(".//resources/asset"):
+        media_rep = asset.find(".//media-rep[@kind='original-media']")
+        if media_rep is None:
+            continue
+        format_elem = root.find(f".//format[@id='{asset.get('format')}']")
+        if format_elem is not None:
+            path_ = urllib.parse.unquote(media_rep.get('src').replace('file://', ''))
+            videos.append((asset.get('id'), path_))
+
+    count = 0
+    for asset_clip in root.findall(".//asset-clip"):
+        ref_id = asset_clip.get('ref')
+        video = next((v for v in videos if v[0] == ref_id), None)
+        if video:
+            count += len(asset_clip.findall("marker"))
+    return count
+
+
+def timed(func, *args) -> tuple[float, int]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000, 5000, 10000])
+    arg_parser.add_argument('--legacy-max', type=int, default=5000,
+                            help='旧实现只在资源数不超过该值时运行（其耗时为平方级）')
+    args = arg_parser.parse_args()
+
+    print(f"{'assets':>8} {'indexed(s)':>12} {'streaming(s)':>13} {'legacy(s)':>10} {'markers':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f'synthetic_{size}.fcpxml')
+            write_document(path, size)
+
+            indexed, markers = timed(lambda: len(FCPXMLParser(path).parse()))
+            streaming, _ = timed(lambda: len(FCPXMLParser(path).parse(streaming=True)))
+            if size <= args.legacy_max:
+                legacy, _ = timed(legacy_parse, path)
+                legacy_text = f'{legacy:10.3f}'
+            else:
+                legacy_text = f"{'-':>10}"
+
+            print(f'{size:8d} {indexed:12.3f} {streaming:13.3f} {legacy_text} {markers:8d}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""各提取配置的每帧耗时基准
+
+对同一视频的若干时间点逐个提取（每帧一个 ffmpeg 进程，单线程顺序执行），
+输出每个提取配置的平均每帧耗时和平均文件大小。未指定视频时用 ffmpeg 生成合成测试视频。
+
+用法:
+    python benchmarks/bench_profiles.py
+    python benchmarks/bench_profiles.py --video clip.mov --frames 20 --resolution ultra
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from fractions import Fraction
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fcpxml_parser import Marker
+from frame_extractor import FrameExtractor, Resolution
+from extraction_profiles import PROFILES
+
+RESOLUTIONS = {
+    'low': Resolution.LOW_LANDSCAPE,
+    'high': Resolution.HIGH_LANDSCAPE,
+    'ultra': Resolution.ULTRA_LANDSCAPE,
+}
+
+
+def write_video(path: str, duration: int = 20):
+    """生成 1920×1440、25fps 的 H.264 合成测试视频"""
+    subprocess.run([
+        'ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', f'testsrc2=size=1920x1440:rate=25:duration={duration}',
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-g', '50', '-y', path
+    ], check=True)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--video', help='测试视频（省略时生成合成视频）')
+    arg_parser.add_argument('--frames', type=int, default=10, help='每个配置提取的帧数')
+    arg_parser.add_argument('--resolution', choices=list(RESOLUTIONS), default='high')
+    arg_parser.add_argument('--backend', choices=['ffmpeg', 'opencv', 'pyav'], default='ffmpeg')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = args.video
+        if not video_path:
+            video_path = os.path.join(tmp, 'synthetic.mp4')
+            write_video(video_path)
+
+        frame_duration = Fraction(1, 25)
+        markers = [
+            Marker(name=f'm{i}', timestamp=0.0, frame_id=25 + i * 37, video_path=video_path,
+                   source_time=(25 + i * 37) * frame_duration, frame_duration=frame_duration)
+            for i in range(args.frames)
+        ]
+
+        print(f"{'profile':>10} {'ms/frame':>10} {'KB/frame':>10}")
+        for profile in PROFILES.values():
+            output_dir = os.path.join(tmp, profile.name)
+            os.makedirs(output_dir)
+            extractor = FrameExtractor(output_dir, resolution=RESOLUTIONS[args.resolution],
+                                       profile=profile, backend=args.backend)
+            start = time.perf_counter()
+            success_count = extractor.extract_frames(markers, open_output_dir=False)
+            elapsed = time.perf_counter() - start
+
+            size = sum(os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir))
+            count = max(1, success_count)
+            print(f'{profile.name:>10} {elapsed / count * 1000:10.1f} {size / count / 1024:10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""命令行提取 FCPXML 标记点对应的帧
+
+用法:
+    python cli.py project.fcpxml -o 输出目录 --profile draft
+    python cli.py project.fcpxml -o 输出目录 --resolution ultra --profile archival --workers 4
+    python cli.py a.fcpxml b.fcpxml 导出文件夹/ -o 输出目录    # 多个项目合并为一个任务，按项目分文件夹输出
+    python cli.py --list-profiles
+"""
+import argparse
+import os
+import sys
+
+from fcpxml_parser import FCPXMLParser, find_fcpxml_files
+from frame_extractor import FitMode, FrameExtractor, Resolution, merge_projects
+from extraction_profiles import DEFAULT_PROFILE, PROFILES
+
+RESOLUTIONS = {
+    'low': Resolution.LOW_LANDSCAPE,
+    'high': Resolution.HIGH_LANDSCAPE,
+    'ultra': Resolution.ULTRA_LANDSCAPE,
+}
+
+
+def list_profiles():
+    for profile in PROFILES.values():
+        print(f"{profile.name:10} {profile.label:6} 缩放: {profile.scaler:13} "
+              f"锐化: {profile.sharpen or '-':<5} 质量: {profile.quality}")
+
+
+def main(argv=None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('fcpxml', nargs='*', help='FCPXML 文件或包含 FCPXML 的文件夹')
+    arg_parser.add_argument('-o', '--output', help='输出目录')
+    arg_parser.add_argument('--resolution', choices=list(RESOLUTIONS), default='high', help='输出分辨率')
+    arg_parser.add_argument('--fit', choices=[mode.value for mode in FitMode], default=FitMode.NO_UPSCALE.value,
+                            help='尺寸适配方式：tier 按分辨率缩放，no_upscale 不放大，native 原尺寸，'
+                                 'long_edge 长边缩放到 --long-edge，box 缩放到分辨率框内并补黑边')
+    arg_parser.add_argument('--long-edge', type=int, help='fit 为 long_edge 时输出的长边像素')
+    arg_parser.add_argument('--profile', choices=list(PROFILES), default=DEFAULT_PROFILE, help='提取配置')
+    arg_parser.add_argument('--backend', choices=['ffmpeg', 'opencv', 'pyav'], default='ffmpeg', help='解码后端')
+    arg_parser.add_argument('--workers', type=int, default=min(8, os.cpu_count() or 1), help='并行任务数')
+    arg_parser.add_argument('--cache-dir', help='解析和视频信息缓存目录')
+    arg_parser.add_argument('--no-resume', action='store_true', help='不写任务日志，也不据此续传')
+    arg_parser.add_argument('--list-profiles', action='store_true', help='列出可用的提取配置')
+    args = arg_parser.parse_args(argv)
+
+    if args.list_profiles:
+        list_profiles()
+        return 0
+    if not args.fcpxml or not args.output:
+        arg_parser.error('需要指定 FCPXML 文件和输出目录 (-o)')
+
+    paths = find_fcpxml_files(args.fcpxml)
+    if not paths:
+        print("未找到 FCPXML 文件")
+        return 1
+    projects = []
+    for path in paths:
+        project_markers = FCPXMLParser(path, cache_dir=args.cache_dir).parse()
+        if not project_markers:
+            print(f"未找到任何标记点: {path}")
+            continue
+        projects.append((path, project_markers))
+    if not projects:
+        print("未找到任何标记点")
+        return 1
+    markers, folders = merge_projects(projects)
+
+    os.makedirs(args.output, exist_ok=True)
+    extractor = FrameExtractor(
+        args.output,
+        resolution=RESOLUTIONS[args.resolution],
+        profile=args.profile,
+        fit=FitMode(args.fit),
+        long_edge=args.long_edge,
+        batch_by_video=True,
+        cache_dir=args.cache_dir,
+        max_workers=args.workers,
+        incremental=True,
+        resume=not args.no_resume,
+        backend=args.backend,
+        use_keyframe_index=args.cache_dir is not None
+    )
+
+    def report(current, total, success_count):
+        print(f"\r提取进度: {current}/{total}（成功 {success_count}）", end='', flush=True)
+
+    success_count = extractor.extract_frames(markers, progress_callback=report, open_output_dir=False,
+                                             folders=folders)
+    print()
+    print(f"完成: {len(projects)} 个项目，{success_count}/{len(markers)} 个标记点，输出目录: {args.output}")
+    return 0 if success_count == len(markers) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
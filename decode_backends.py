@@ -0,0 +1,230 @@
+import os
+from typing import Iterator, List, Optional
+from extraction_profiles import ExtractionProfile
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # 未安装 opencv-python / numpy 时只能使用 ffmpeg 命令行
+    cv2 = None
+    np = None
+
+try:
+    import av
+except ImportError:
+    av = None
+
+
+# ffmpeg 缩放算法对应的 OpenCV 插值方法
+_INTERPOLATION = {
+    'fast_bilinear': cv2.INTER_LINEAR,
+    'bilinear': cv2.INTER_LINEAR,
+    'bicubic': cv2.INTER_CUBIC,
+    'lanczos': cv2.INTER_LANCZOS4,
+} if cv2 is not None else {}
+
+# 显示矩阵的旋转角度（逆时针为正）对应的 OpenCV 旋转方式，与 ffmpeg 自动旋转的结果一致
+_ROTATIONS = {
+    90: cv2.ROTATE_90_COUNTERCLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_CLOCKWISE,
+} if cv2 is not None else {}
+
+
+def apply_rotation(image: 'np.ndarray', rotation: float) -> 'np.ndarray':
+    """按显示矩阵的旋转角度校正画面方向"""
+    code = _ROTATIONS.get(int(round(rotation)) % 360)
+    return image if code is None else cv2.rotate(image, code)
+
+
+class DecodeBackend:
+    """进程内解码后端：每个视频只打开一次，按时间顺序定位并解码目标帧"""
+
+    name = ''
+
+    def __init__(self, forward_decode_limit: float = 2.0):
+        # 目标帧在当前位置之后且距离不超过该秒数时继续向前解码，而不是重新定位
+        self.forward_decode_limit = forward_decode_limit
+
+    @classmethod
+    def available(cls) -> bool:
+        return cv2 is not None
+
+    def frames(self, video_path: str, times: List[float],
+               spans: Optional[List[List[int]]] = None) -> Iterator[tuple[int, 'np.ndarray']]:
+        """按时间顺序解码 times 中每个时间点的帧，产出 (原索引, BGR 图像)
+
+        每个时间点取第一帧时间不早于该时间的画面（与 ffmpeg -ss 精确定位一致）。
+        spans 为执行计划：每段开头定位一次，段内继续向前解码；省略时按距离自行判断。
+        无法解码的时间点不会产出。
+        """
+        raise NotImplementedError
+
+    def _schedule(self, times: List[float], spans: Optional[List[List[int]]]) -> Iterator[tuple[int, bool]]:
+        """按执行计划产出 (索引, 是否需要定位)"""
+        if spans is not None:
+            for span in spans:
+                for j, index in enumerate(span):
+                    yield index, j == 0
+            return
+
+        position = None
+        for index in sorted(range(len(times)), key=lambda i: times[i]):
+            target = times[index]
+            yield index, (position is None or target < position
+                          or target - position > self.forward_decode_limit)
+            position = target
+
+
+class OpenCVBackend(DecodeBackend):
+    """基于 cv2.VideoCapture 的解码后端"""
+
+    name = 'opencv'
+
+    def frames(self, video_path, times, spans=None):
+        capture = cv2.VideoCapture(video_path)
+        if not capture.isOpened():
+            print(f"无法打开视频: {video_path}")
+            return
+        try:
+            frame = None
+            frame_time = None
+            for index, seek in self._schedule(times, spans):
+                target = times[index]
+                if seek or frame is None or target < frame_time:
+                    capture.set(cv2.CAP_PROP_POS_MSEC, target * 1000)
+                    frame = None
+                # 当前帧已满足（多个标记点落在同一帧）时直接复用
+                while frame is None or frame_time < target:
+                    ok, frame = capture.read()
+                    if not ok:
+                        frame = None
+                        break
+                    frame_time = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                if frame is None:
+                    continue
+                yield index, frame
+        finally:
+            capture.release()
+
+
+class PyAVBackend(DecodeBackend):
+    """基于 PyAV 的解码后端，按关键帧定位后精确解码"""
+
+    name = 'pyav'
+
+    @classmethod
+    def available(cls) -> bool:
+        return av is not None and cv2 is not None
+
+    def frames(self, video_path, times, spans=None):
+        try:
+            container = av.open(video_path)
+        except Exception as e:
+            print(f"无法打开视频: {str(e)}")
+            return
+        try:
+            stream = container.streams.video[0]
+            stream.thread_type = 'AUTO'
+            start = float(stream.start_time * stream.time_base) if stream.start_time is not None else 0.0
+            decoder = None
+            frame = None
+            for index, seek in self._schedule(times, spans):
+                target = times[index]
+                if seek or decoder is None or (frame is not None and frame.time - start > target):
+                    # 定位到目标之前的关键帧，再向前解码
+                    container.seek(int((start + target) / stream.time_base), stream=stream, backward=True)
+                    decoder = container.decode(stream)
+                    frame = None
+                while frame is None or frame.time - start < target:
+                    frame = next(decoder, None)
+                    if frame is None:
+                        break
+                if frame is None:
+                    continue
+                # to_ndarray 不处理显示矩阵，手机竖拍素材需按 frame.rotation 旋转（与 ffmpeg、OpenCV 一致）
+                yield index, apply_rotation(frame.to_ndarray(format='bgr24'), getattr(frame, 'rotation', 0) or 0)
+        finally:
+            container.close()
+
+
+def scan_keyframes(video_path: str) -> Optional[tuple[List[float], int]]:
+    """使用 PyAV 只解复用不解码，扫描数据包的关键帧标志
+
+    返回 (关键帧时间列表, 数据包总数)，PyAV 不可用或读取失败时返回 None。
+    """
+    if av is None:
+        return None
+    try:
+        with av.open(video_path) as container:
+            stream = container.streams.video[0]
+            start = stream.start_time or 0
+            times = []
+            count = 0
+            for packet in container.demux(stream):
+                if packet.pts is None:
+                    continue
+                count += 1
+                if packet.is_keyframe:
+                    times.append(float((packet.pts - start) * stream.time_base))
+            return times, count
+    except Exception as e:
+        print(f"扫描关键帧失败: {str(e)}")
+        return None
+
+
+BACKENDS = {
+    OpenCVBackend.name: OpenCVBackend,
+    PyAVBackend.name: PyAVBackend,
+}
+
+
+def create_backend(name: str) -> DecodeBackend:
+    """按名称创建解码后端，依赖未安装时抛出 RuntimeError"""
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"未知的解码后端: {name}")
+    if not backend_class.available():
+        raise RuntimeError(f"解码后端 {name} 不可用，请安装相应的依赖（opencv-python / av）")
+    return backend_class()
+
+
+def process_frame(image: 'np.ndarray', scaled_size: Optional[tuple[int, int]], canvas_size: tuple[int, int],
+                  profile: ExtractionProfile) -> 'np.ndarray':
+    """按提取配置缩放和锐化（锐化对应 ffmpeg 的 unsharp=3:3:强度），再居中补黑边到 canvas_size
+
+    scaled_size 为 None 时保持原画面，不缩放也不锐化。
+    """
+    if scaled_size is not None:
+        interpolation = _INTERPOLATION.get(profile.scaler, cv2.INTER_LINEAR)
+        image = cv2.resize(image, scaled_size, interpolation=interpolation)
+        if profile.sharpen:
+            blurred = cv2.GaussianBlur(image, (3, 3), 0)
+            image = cv2.addWeighted(image, 1 + profile.sharpen, blurred, -profile.sharpen, 0)
+    
+    height, width = image.shape[:2]
+    canvas_width, canvas_height = canvas_size
+    if (width, height) != (canvas_width, canvas_height):
+        left = (canvas_width - width) // 2
+        top = (canvas_height - height) // 2
+        image = cv2.copyMakeBorder(image, top, canvas_height - height - top, left, canvas_width - width - left,
+                                   cv2.BORDER_CONSTANT, value=(0, 0, 0))
+    return image
+
+
+def encode_frame(image: 'np.ndarray', output_path: str, quality: int) -> bool:
+    """在进程内编码并原子写入图片文件"""
+    ext = os.path.splitext(output_path)[1].lower()
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality] if ext in ('.jpg', '.jpeg') else []
+    ok, data = cv2.imencode(ext, image, params)
+    if not ok:
+        return False
+    tmp_path = f"{output_path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data.tobytes())
+        os.replace(tmp_path, output_path)
+    except OSError as e:
+        print(f"写入图片失败: {str(e)}")
+        return False
+    return True
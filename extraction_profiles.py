@@ -0,0 +1,57 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class ExtractionProfile:
+    """提取配置：缩放算法、锐化、编码器、质量和解码线程数"""
+    name: str
+    label: str
+    # ffmpeg swscale 缩放算法：fast_bilinear / bilinear / bicubic / lanczos
+    scaler: str
+    # unsharp 亮度锐化强度，None 表示不锐化
+    sharpen: Optional[float]
+    # ffmpeg 图片编码器
+    encoder: str
+    # 输出质量 1-100
+    quality: int
+    # ffmpeg 解码线程数，0 表示自动
+    threads: int = 0
+
+    @property
+    def qscale(self) -> int:
+        """质量换算为 ffmpeg 的 qscale（1 最好，31 最差）"""
+        return max(1, min(31, round((100 - self.quality) / 3.3)))
+
+
+# 每帧耗时和文件大小由 benchmarks/bench_profiles.py 测得（合成 1920×1440 H.264 源，GOP 50，
+# 输出 1920×1080，每帧一个 ffmpeg 进程，单线程顺序执行；定位和解码占大部分耗时）：
+#   draft     344 ms   53 KB
+#   review    377 ms   68 KB
+#   standard  384 ms   96 KB
+#   high      402 ms  160 KB
+#   archival  429 ms  229 KB
+PROFILES: Dict[str, ExtractionProfile] = {profile.name: profile for profile in [
+    ExtractionProfile('draft', '草稿', scaler='fast_bilinear', sharpen=None, encoder='mjpeg', quality=75),
+    ExtractionProfile('review', '审阅', scaler='bilinear', sharpen=None, encoder='mjpeg', quality=85),
+    ExtractionProfile('standard', '标准', scaler='bicubic', sharpen=None, encoder='mjpeg', quality=90),
+    ExtractionProfile('high', '高质量', scaler='lanczos', sharpen=1.0, encoder='mjpeg', quality=95),
+    ExtractionProfile('archival', '存档', scaler='lanczos', sharpen=1.5, encoder='mjpeg', quality=100),
+]}
+
+DEFAULT_PROFILE = 'archival'
+
+
+def get_profile(profile) -> ExtractionProfile:
+    """按名称获取配置，也接受 ExtractionProfile 实例"""
+    if isinstance(profile, ExtractionProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"未知的提取配置: {profile}（可选: {', '.join(PROFILES)}）")
+
+
+def profile_names() -> List[str]:
+    """按从快到慢排列的配置名称"""
+    return list(PROFILES)
@@ -0,0 +1,167 @@
+import json
+import os
+from typing import Dict, List, Optional
+from fcpxml_parser import Marker
+
+MANIFEST_FILENAME = '.fcpx_manifest.json'
+MANIFEST_VERSION = 2
+JOURNAL_SUFFIX = '.fcpx-journal.jsonl'
+
+
+def marker_identity(marker: Marker) -> dict:
+    """标记点的身份：名称、源视频和精确的源时间"""
+    source_time = marker.source_time if marker.source_time is not None else marker.timestamp
+    return {
+        'name': marker.name,
+        'video_path': marker.video_path,
+        'source_time': str(source_time),
+    }
+
+
+def is_valid_output(path: str) -> bool:
+    """检查输出文件是否完整（存在、非空，且图片文件头尾完整）"""
+    try:
+        size = os.path.getsize(path)
+        if size == 0:
+            return False
+        with open(path, 'rb') as f:
+            head = f.read(8)
+            f.seek(max(0, size - 2))
+            tail = f.read(2)
+    except OSError:
+        return False
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.jpg', '.jpeg'):
+        # JPEG 以 SOI 开始、EOI 结束，写入中断的文件缺少 EOI
+        return head[:2] == b'\xff\xd8' and tail == b'\xff\xd9'
+    if ext == '.png':
+        return head == b'\x89PNG\r\n\x1a\n'
+    return True
+
+
+class ExtractionManifest:
+    """输出目录中的提取清单，记录每个输出文件对应的标记点和提取设置
+
+    再次提取时与清单比较，只处理新增或变化的标记点。
+    """
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, MANIFEST_FILENAME)
+        self.settings: Optional[dict] = None
+        self.entries: Dict[str, dict] = {}
+
+    def load(self) -> 'ExtractionManifest':
+        """读取清单，文件不存在或损坏时视为空清单"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return self
+        except (OSError, ValueError) as e:
+            print(f"读取提取清单失败: {str(e)}")
+            return self
+
+        if data.get('version') == MANIFEST_VERSION:
+            self.settings = data.get('settings')
+            self.entries = data.get('entries', {})
+        return self
+
+    def save(self):
+        """原子写入清单"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': MANIFEST_VERSION,
+                    'settings': self.settings,
+                    'entries': self.entries,
+                }, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"写入提取清单失败: {str(e)}")
+
+    def is_current(self, output_name: str, marker: Marker, settings: dict, output_paths: List[str]) -> bool:
+        """该输出是否已按相同的标记点和设置提取过"""
+        if self.settings != settings:
+            return False
+        entry = self.entries.get(output_name)
+        if entry is None or entry.get('marker') != marker_identity(marker):
+            return False
+        return all(is_valid_output(path) for path in output_paths)
+
+
+class ExtractionJournal:
+    """追加写入的提取任务日志，保存在输出目录旁边
+
+    每完成或失败一帧追加一行并同步到磁盘，程序崩溃、休眠或 ffmpeg 卡死后，
+    可据此跳过已完成的帧，只重试失败和未处理的部分。
+    """
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.normpath(output_dir) + JOURNAL_SUFFIX
+        self._file = None
+
+    def completed(self, settings: dict) -> Dict[str, dict]:
+        """读取上次任务中已完成的输出及其标记点身份；设置不同时返回空"""
+        completed = {}
+        job_settings = None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 崩溃时最后一行可能只写了一半
+                        continue
+                    event = record.get('event')
+                    if event == 'job':
+                        # 设置变化的任务之间结果不可复用
+                        if record.get('settings') != job_settings:
+                            completed = {}
+                        job_settings = record.get('settings')
+                    elif event == 'done':
+                        completed[record['output']] = record.get('marker')
+                    elif event == 'failed':
+                        completed.pop(record['output'], None)
+        except FileNotFoundError:
+            return {}
+        except OSError as e:
+            print(f"读取任务日志失败: {str(e)}")
+            return {}
+
+        if job_settings != settings:
+            return {}
+        return completed
+
+    def open(self, settings: dict, total: int, resume: bool):
+        """开始记录；非续传时清空旧日志"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        self._append({'event': 'job', 'settings': settings, 'total': total})
+
+    def record(self, output_name: str, marker: Marker, ok: bool):
+        """记录一帧的结果"""
+        self._append({
+            'event': 'done' if ok else 'failed',
+            'output': output_name,
+            'marker': marker_identity(marker),
+        })
+
+    def _append(self, record: dict):
+        if self._file is None:
+            return
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self, finished: bool):
+        """结束记录；全部成功时删除日志"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if finished:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -1,8 +1,12 @@
 import xml.etree.ElementTree as ET
 from dataclasses import dataclass
-from typing import List
+from fractions import Fraction
+from typing import Dict, Iterator, List, Optional
+import hashlib
 import os
+import pickle
 import urllib.parse
+from fcpxml_time import FrameRate, parse_time
 
 @dataclass
 class Marker:
@@ -10,44 +14,97 @@ class Marker:
     timestamp: float
     frame_id: int
     video_path: str
+    timeline_time: float = 0.0
+    # 视频文件内的精确时间和帧时长，用于按帧精确定位
+    source_time: Optional[Fraction] = None
+    frame_duration: Optional[Fraction] = None
+    timecode: str = ""
+
+    @property
+    def seek_time(self) -> float:
+        """用于 ffmpeg 定位的时间
+
+        提前四分之一帧，保证浮点误差下选中的仍是目标帧（ffmpeg 输出第一帧 pts >= 该时间）。
+        """
+        if self.frame_duration is None:
+            return self.timestamp
+        return float(max(Fraction(0), (self.frame_id - Fraction(1, 4)) * self.frame_duration))
 
 @dataclass
 class VideoInfo:
     path: str
     fps: float
-    start_time: float = 0.0
+    start_time: Fraction = Fraction(0)
     clip_id: str = ""
-    duration: float = 0.0
+    duration: Fraction = Fraction(0)
+    frame_rate: Optional[FrameRate] = None
+
+# 解析结果缓存的版本号，解析逻辑或 Marker / VideoInfo 结构变化时递增
+PARSER_VERSION = 1
+
+def find_fcpxml_files(paths: List[str]) -> List[str]:
+    """展开文件和文件夹（递归）为 FCPXML 文件列表，保持顺序并去重"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                found.extend(os.path.join(root, name) for name in sorted(files)
+                             if name.lower().endswith('.fcpxml') and not name.startswith('.'))
+        elif path.lower().endswith('.fcpxml'):
+            found.append(path)
+    return list(dict.fromkeys(os.path.abspath(path) for path in found))
+
+def project_path(path: str) -> str:
+    """项目路径：FCP 10.6 起的 .fcpxmld 包中，项目文件为 Info.fcpxml，以包本身代表项目"""
+    folder, name = os.path.split(path.rstrip(os.sep))
+    if name.lower() == 'info.fcpxml' and folder.lower().endswith('.fcpxmld'):
+        return folder
+    return path
 
 class FCPXMLParser:
-    def __init__(self, xml_path: str):
+    def __init__(self, xml_path: str, cache_dir: Optional[str] = None):
         self.xml_path = xml_path
+        # 解析结果缓存目录，为 None 时不使用缓存
+        self.cache_dir = cache_dir
         self.markers = []
         self.fps = 30
+        self.frame_rate = FrameRate(Fraction(1, 30))
         self.videos = []
+        # 按 id 索引的资源表，所有引用都通过这些表解析
+        self.formats: Dict[str, ET.Element] = {}
+        self.assets: Dict[str, ET.Element] = {}
+        self.video_by_id: Dict[str, VideoInfo] = {}
+        self.media: Dict[str, ET.Element] = {}
+        # 复合片段 / 多机位片段内部标记点的缓存，同一定义只遍历一次
+        self._compound_markers: Dict[tuple, List[tuple]] = {}
         
     def _parse_time(self, time_str: str) -> tuple[float, int]:
-        if not time_str:
-            return 0.0, 0
-            
-        time_str = time_str.rstrip('s')
-        
-        if '/' in time_str:
-            numerator, denominator = map(float, time_str.split('/'))
-            seconds = numerator / denominator
-            frame = int(numerator)
-            return seconds, frame
-        
-        seconds = float(time_str)
-        frame = int(seconds * self.fps)
-        return seconds, frame
+        """解析时间，返回 (秒, 帧号)，帧号按项目帧率计算"""
+        seconds = parse_time(time_str)
+        return float(seconds), self.frame_rate.frame_index(seconds)
         
+    def _index_resources(self, root: ET.Element):
+        """一次遍历 resources，建立 format 和 asset 的 id 索引"""
+        for resources in root.iter('resources'):
+            for elem in resources:
+                elem_id = elem.get('id')
+                if not elem_id:
+                    continue
+                if elem.tag == 'format':
+                    self.formats[elem_id] = elem
+                elif elem.tag == 'asset':
+                    self.assets[elem_id] = elem
+                elif elem.tag == 'media':
+                    self.media[elem_id] = elem
+
     def _find_video_info(self, root: ET.Element) -> List[VideoInfo]:
         """查找所有视频文件信息"""
+        self._index_resources(root)
+        
         videos = []
         # 查找所有资源
-        for asset in root.findall(".//resources/asset"):
-            asset_id = asset.get('id')
+        for asset_id, asset in self.assets.items():
             media_rep = asset.find(".//media-rep[@kind='original-media']")
             if media_rep is not None:
                 src = media_rep.get('src')
@@ -55,72 +112,331 @@ class FCPXMLParser:
                     # 处理URL编码的路径
                     path = urllib.parse.unquote(src.replace('file://', ''))
                     
-                    # 查找帧率信息
-                    format_elem = root.find(f".//format[@id='{asset.get('format')}']")
+                    # 查找帧率信息（同一 frameDuration 的 FrameRate 只创建一次）
+                    format_elem = self.formats.get(asset.get('format'))
                     if format_elem is not None:
                         fps_str = format_elem.get('frameDuration')
                         if fps_str and '/' in fps_str:
-                            _, denominator = map(float, fps_str.rstrip('s').split('/'))
-                            fps = denominator
+                            frame_rate = FrameRate.from_frame_duration(fps_str)
                             
                             videos.append(VideoInfo(
                                 path=path,
-                                fps=fps,
-                                clip_id=asset_id
+                                fps=float(frame_rate.fps),
+                                start_time=self._time(asset, 'start'),
+                                clip_id=asset_id,
+                                duration=self._time(asset, 'duration'),
+                                frame_rate=frame_rate
                             ))
+        
+        self.video_by_id = {video.clip_id: video for video in videos}
         return videos
         
-    def parse(self) -> List[Marker]:
-        """解析FCPXML文件中的所有标记点和视频信息"""
-        tree = ET.parse(self.xml_path)
-        root = tree.getroot()
+    @staticmethod
+    def _time(elem: ET.Element, attr: str, default: str = '0s') -> Fraction:
+        """读取元素上的时间属性（精确有理数秒）"""
+        return parse_time(elem.get(attr, default))
+
+    @staticmethod
+    def _is_primary(elem: ET.Element) -> bool:
+        """是否位于主故事情节（非连接片段）"""
+        return elem.get('lane', '0') == '0'
+
+    def _resolve(self, elem: ET.Element, local_time: Fraction, depth: int = 0, tc_format: Optional[str] = None):
+        """将元素本地时间解析为 (VideoInfo, 素材时间, 时码格式)，无法对应到视频时返回 None"""
+        if depth > 32:
+            return None
+            
+        tag = elem.tag
+        tc_format = elem.get('tcFormat', tc_format)
+        if tag in ('asset-clip', 'video'):
+            # 片段的本地时间轴即素材时间轴
+            video_info = self.video_by_id.get(elem.get('ref'))
+            return (video_info, local_time, tc_format) if video_info else None
         
-        # 获取所有视频信息
-        self.videos = self._find_video_info(root)
-        if self.videos:
-            self.fps = self.videos[0].fps
+        if tag == 'ref-clip':
+            media = self.media.get(elem.get('ref'))
+            sequence = media.find('sequence') if media is not None else None
+            if sequence is None:
+                return None
+            return self._resolve_children(sequence, local_time, depth, tc_format)
         
-        # 解析标记点
-        for asset_clip in root.findall(".//asset-clip"):
-            # 获取视频引用ID
-            ref_id = asset_clip.get('ref')
+        if tag == 'mc-clip':
+            angle = self._active_angle(elem)
+            if angle is None:
+                return None
+            return self._resolve_children(angle, local_time, depth, tc_format)
+        
+        if tag == 'audition':
+            # 试演片段只有第一个子片段处于激活状态
+            active = next((child for child in elem if child.get('offset') is not None), None)
+            if active is None:
+                return None
+            return self._resolve(active, local_time - self._time(active, 'offset') + self._time(active, 'start'),
+                                 depth + 1, tc_format)
+        
+        return self._resolve_children(elem, local_time, depth, tc_format)
+
+    def _resolve_children(self, container: ET.Element, local_time: Fraction, depth: int,
+                          tc_format: Optional[str] = None):
+        """在容器的主故事情节中找到覆盖该时间点的子元素并继续解析"""
+        for child in container:
+            if child.tag == 'marker' or not self._is_primary(child):
+                continue
+            if child.tag != 'spine' and child.get('offset') is None:
+                continue
             
-            # 找到对应的视频信息
-            video_info = next((v for v in self.videos if v.clip_id == ref_id), None)
-            if not video_info:
+            offset = self._time(child, 'offset')
+            duration = child.get('duration')
+            if local_time < offset:
+                continue
+            if duration is not None and local_time >= offset + self._time(child, 'duration'):
                 continue
             
-            # 获取片段的偏移时间
-            offset = 0.0
-            offset_str = asset_clip.get('offset', '0s')
-            offset, _ = self._parse_time(offset_str)
+            child_time = local_time - offset + self._time(child, 'start')
+            resolved = self._resolve(child, child_time, depth + 1, tc_format)
+            if resolved:
+                return resolved
+        return None
+
+    def _active_angle(self, mc_clip: ET.Element):
+        """多机位片段当前使用的视频机位"""
+        media = self.media.get(mc_clip.get('ref'))
+        multicam = media.find('multicam') if media is not None else None
+        if multicam is None:
+            return None
             
-            # 解析此片段中的所有标记点
-            for marker in asset_clip.findall("marker"):
-                name = marker.get('value', 'unnamed_marker')
-                start = marker.get('start', '0')
-                
+        angle_id = None
+        for source in mc_clip.findall('mc-source'):
+            if source.get('srcEnable', 'all') in ('all', 'video'):
+                angle_id = source.get('angleID')
+                break
+        
+        for angle in multicam.findall('mc-angle'):
+            if angle_id is None or angle.get('angleID') == angle_id:
+                return angle
+        return None
+
+    def _walk_element(self, elem: ET.Element, parent_shift: Fraction, depth: int = 0) -> Iterator[tuple]:
+        """遍历一个故事元素，产出 (名称, 时间, VideoInfo, 素材时间, 时码格式)
+
+        shift 为本地时间到遍历根时间轴的平移量：每进入一层，
+        shift += offset - start，因此 offset/start 变换栈折叠为一个数值。
+        """
+        if depth > 32:
+            return
+            
+        shift = parent_shift + self._time(elem, 'offset') - self._time(elem, 'start')
+        
+        for child in elem:
+            if child.tag == 'marker':
+                name = child.get('value', 'unnamed_marker')
+                start = child.get('start', '0')
                 try:
-                    timestamp, frame_id = self._parse_time(start)
-                    
-                    # 调整时间戳（考虑片段偏移）
-                    adjusted_timestamp = timestamp
-                    
-                    self.markers.append(Marker(
-                        name=name,
-                        timestamp=adjusted_timestamp,
-                        frame_id=frame_id,
-                        video_path=video_info.path
-                    ))
-                except ValueError as e:
+                    local_time = self._time(child, 'start', '0')
+                except ValueError:
                     print(f"警告: 无法解析时间戳 '{start}' (标记点: {name})")
                     continue
+                resolved = self._resolve(elem, local_time)
+                if resolved:
+                    yield (name, local_time + shift, *resolved)
+            elif child.tag == 'spine' or child.get('offset') is not None:
+                yield from self._walk_element(child, shift, depth + 1)
+        
+        # 复合片段和多机位片段：内部标记点按定义缓存，再映射到本次使用的位置
+        if elem.tag in ('ref-clip', 'mc-clip'):
+            visible_start = self._time(elem, 'start')
+            duration = elem.get('duration')
+            visible_end = visible_start + self._time(elem, 'duration') if duration else None
+            for name, inner_time, *resolved in self._inner_markers(elem, depth):
+                # 只保留本次使用范围内可见的标记点
+                if inner_time < visible_start or (visible_end is not None and inner_time >= visible_end):
+                    continue
+                yield (name, inner_time + shift, *resolved)
+
+    def _inner_markers(self, elem: ET.Element, depth: int) -> List[tuple]:
+        """复合 / 多机位片段定义内的标记点，按定义缓存"""
+        if elem.tag == 'ref-clip':
+            key = (elem.get('ref'), None)
+            media = self.media.get(elem.get('ref'))
+            container = media.find('sequence') if media is not None else None
+        else:
+            angle = self._active_angle(elem)
+            key = (elem.get('ref'), angle.get('angleID') if angle is not None else None)
+            container = angle
+        
+        if key not in self._compound_markers:
+            # 先占位，防止循环引用导致无限递归
+            self._compound_markers[key] = []
+            if container is not None:
+                self._compound_markers[key] = list(self._walk_element(container, Fraction(0), depth + 1))
+        return self._compound_markers[key]
+
+    def _make_marker(self, record: tuple) -> Marker:
+        """将遍历结果转换为 Marker
+
+        素材时间减去 asset 的起点即为视频文件内的时间，帧号为文件内的真实帧序号。
+        """
+        name, timeline_time, video_info, source_time, tc_format = record
+        frame_rate = video_info.frame_rate or self.frame_rate
+        file_time = max(Fraction(0), source_time - video_info.start_time)
+        frame_id = frame_rate.frame_index(file_time)
+        return Marker(
+            name=name,
+            timestamp=float(file_time),
+            frame_id=frame_id,
+            video_path=video_info.path,
+            timeline_time=float(timeline_time),
+            source_time=file_time,
+            frame_duration=frame_rate.frame_duration,
+            timecode=frame_rate.timecode(source_time, drop_frame=tc_format == 'DF')
+        )
+
+    def _iter_roots(self, elem: ET.Element, parent_tag: str = '') -> Iterator[ET.Element]:
+        """按文档顺序查找遍历起点：序列主故事情节中的元素，以及事件中的浏览器片段"""
+        for child in elem:
+            if child.tag == 'resources':
+                continue
+            if self._is_root(child.tag, elem.tag, parent_tag):
+                yield child
+            else:
+                yield from self._iter_roots(child, elem.tag)
+
+    @staticmethod
+    def _is_root(tag: str, parent_tag: str, grandparent_tag: str) -> bool:
+        if tag in ('marker', 'spine'):
+            return False
+        if parent_tag == 'spine' and grandparent_tag == 'sequence':
+            return True
+        return parent_tag in ('event', 'fcpxml') and tag not in ('project', 'event', 'library', 'resources')
+
+    def parse(self, streaming: bool = False) -> List[Marker]:
+        """解析FCPXML文件中的所有标记点和视频信息
+
+        遍历序列中所有故事元素（包括连接片段、间隙、复合片段、同步片段和多机位片段），
+        将每个标记点解析到其源视频和源时间。
+        streaming 为 True 时使用增量解析，内存占用与文档大小无关。
+        指定 cache_dir 时，内容相同的文档直接从缓存加载。
+        """
+        cache_path = self._cache_path() if self.cache_dir else None
+        if cache_path and self._load_cache(cache_path):
+            return self.markers
+        
+        if streaming:
+            self.markers.extend(self.iter_markers())
+            if not self.markers:
+                print("未找到任何标记点。")
+        else:
+            self._parse_tree()
+        
+        if cache_path:
+            self._save_cache(cache_path)
+        return self.markers
+
+    def _parse_tree(self):
+        """完整加载文档后解析"""
+        tree = ET.parse(self.xml_path)
+        root = tree.getroot()
+        
+        # 获取所有视频信息
+        self.videos = self._find_video_info(root)
+        if self.videos:
+            self.fps = self.videos[0].fps
+            self.frame_rate = self.videos[0].frame_rate
+        
+        # 解析标记点
+        for elem in self._iter_roots(root):
+            for record in self._walk_element(elem, Fraction(0)):
+                self.markers.append(self._make_marker(record))
         
         if not self.markers:
             print("未找到任何标记点。")
             self._print_xml_structure(root)
+
+    def _cache_path(self) -> str:
+        """根据文档内容哈希和解析器版本生成缓存文件路径"""
+        digest = hashlib.sha256()
+        with open(self.xml_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return os.path.join(self.cache_dir, 'parse', f"v{PARSER_VERSION}-{digest.hexdigest()}.pickle")
+
+    def _load_cache(self, cache_path: str) -> bool:
+        """从缓存加载解析结果，成功返回 True"""
+        try:
+            with open(cache_path, 'rb') as f:
+                cached = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f"读取解析缓存失败: {str(e)}")
+            return False
         
-        return self.markers
+        self.markers.extend(cached['markers'])
+        self.videos = cached['videos']
+        self.video_by_id = {video.clip_id: video for video in self.videos}
+        if self.videos:
+            self.fps = self.videos[0].fps
+            self.frame_rate = self.videos[0].frame_rate
+        return True
+
+    def _save_cache(self, cache_path: str):
+        """写入解析结果缓存"""
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({'markers': self.markers, 'videos': self.videos}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"写入解析缓存失败: {str(e)}")
+
+    def iter_markers(self) -> Iterator[Marker]:
+        """流式解析标记点，逐个片段产出 Marker
+
+        resources 只读取一次；每个顶层故事元素结束时遍历并清除，
+        因此峰值内存不随文档大小增长。
+        """
+        stack = []
+        in_resources = False
+        
+        for event, elem in ET.iterparse(self.xml_path, events=('start', 'end')):
+            if event == 'start':
+                stack.append(elem)
+                if elem.tag == 'resources':
+                    in_resources = True
+                continue
+            
+            stack.pop()
+            
+            if elem.tag == 'resources':
+                # 资源读取完毕，建立视频信息表（此时根节点下只有 resources）
+                in_resources = False
+                self.videos = self._find_video_info(stack[0])
+                if self.videos:
+                    self.fps = self.videos[0].fps
+                    self.frame_rate = self.videos[0].frame_rate
+                continue
+            
+            if in_resources or not stack:
+                continue
+            
+            parent_tag = stack[-1].tag
+            grandparent_tag = stack[-2].tag if len(stack) > 1 else ''
+            if self._is_root(elem.tag, parent_tag, grandparent_tag):
+                for record in self._walk_element(elem, Fraction(0)):
+                    yield self._make_marker(record)
+                # 顶层元素处理完即可释放
+                elem.clear()
+                stack[-1].remove(elem)
+            elif elem.tag not in ('marker',) and len(elem) == 0 and not self._inside_root(stack):
+                stack[-1].remove(elem)
+
+    def _inside_root(self, stack: List[ET.Element]) -> bool:
+        """当前位置是否位于某个尚未结束的顶层元素内部"""
+        for i in range(1, len(stack)):
+            if self._is_root(stack[i].tag, stack[i - 1].tag, stack[i - 2].tag if i > 1 else ''):
+                return True
+        return False
 
     def _print_xml_structure(self, element, level=0):
         """打印XML结构，用于调试"""
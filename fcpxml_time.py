@@ -0,0 +1,89 @@
+from fractions import Fraction
+from functools import lru_cache
+import math
+
+
+@lru_cache(maxsize=4096)
+def parse_time(time_str: str) -> Fraction:
+    """将 FCPXML 时间（如 '1001/30000s'、'3600s'）解析为精确的有理数秒"""
+    if not time_str:
+        return Fraction(0)
+
+    time_str = time_str.strip().rstrip('s')
+    if not time_str:
+        return Fraction(0)
+
+    if '/' in time_str:
+        numerator, denominator = time_str.split('/')
+        return Fraction(int(numerator), int(denominator))
+
+    # 整数或小数秒，Fraction 按十进制精确解析
+    return Fraction(time_str)
+
+
+class FrameRate:
+    """由 format 的 frameDuration 定义的帧率，全部使用精确有理数运算"""
+
+    def __init__(self, frame_duration: Fraction):
+        if frame_duration <= 0:
+            raise ValueError(f"无效的帧时长: {frame_duration}")
+        self.frame_duration = frame_duration
+        self.fps = 1 / frame_duration
+        # 时码使用的名义帧率，如 29.97 -> 30, 59.94 -> 60
+        self.nominal_fps = max(1, round(self.fps))
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def from_frame_duration(cls, frame_duration: str) -> 'FrameRate':
+        """按 frameDuration 字符串缓存 FrameRate 实例"""
+        return cls(parse_time(frame_duration))
+
+    @property
+    def is_ntsc(self) -> bool:
+        """是否为 NTSC 帧率（23.976、29.97、59.94 等）"""
+        return self.fps.denominator == 1001
+
+    @property
+    def supports_drop_frame(self) -> bool:
+        """丢帧时码只对 29.97 及其倍数有效"""
+        return self.is_ntsc and self.nominal_fps % 30 == 0
+
+    def frame_index(self, seconds: Fraction) -> int:
+        """时间点所在的帧号（向下取整到帧边界）"""
+        return math.floor(Fraction(seconds) / self.frame_duration)
+
+    def frame_time(self, frame_index: int) -> Fraction:
+        """帧的起始时间"""
+        return frame_index * self.frame_duration
+
+    def timecode(self, seconds: Fraction, drop_frame: bool = False) -> str:
+        """将时间转换为时码字符串，丢帧时码使用 ';' 分隔帧"""
+        frame = self.frame_index(seconds)
+        fps = self.nominal_fps
+        drop_frame = drop_frame and self.supports_drop_frame
+
+        if drop_frame:
+            # 每分钟丢弃前 N 个帧号，逢十分钟不丢
+            drop = fps // 15
+            frames_per_minute = fps * 60 - drop
+            frames_per_10_minutes = frames_per_minute * 10 + drop
+            tens, remainder = divmod(frame, frames_per_10_minutes)
+            frame += drop * 9 * tens
+            if remainder > drop:
+                frame += drop * ((remainder - drop) // frames_per_minute)
+
+        frames = frame % fps
+        total_seconds = frame // fps
+        hours, rest = divmod(total_seconds, 3600)
+        minutes, secs = divmod(rest, 60)
+        separator = ';' if drop_frame else ':'
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{frames:02d}"
+
+    def __eq__(self, other):
+        return isinstance(other, FrameRate) and self.frame_duration == other.frame_duration
+
+    def __hash__(self):
+        return hash(self.frame_duration)
+
+    def __repr__(self):
+        return f"FrameRate({self.frame_duration})"
@@ -1,11 +1,48 @@
+import asyncio
 import subprocess
 import os
+import shutil
 import sys
-from typing import List
-from fcpxml_parser import Marker
+import threading
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, List, Optional
+from fcpxml_parser import Marker, project_path
+from media_cache import MediaCache, get_media_cache
+from extraction_state import ExtractionJournal, ExtractionManifest, is_valid_output, marker_identity
+from seek_planner import KeyframeIndex, SeekPlanner
+from shared_frames import FrameDescriptor, SharedFrameRing
+from extraction_profiles import DEFAULT_PROFILE, ExtractionProfile, get_profile
+import decode_backends
 from enum import Enum
 import json
 from datetime import datetime
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+if TYPE_CHECKING:  # 仅用于类型注解，numpy 是可选依赖
+    import numpy as np
+
+
+def tool_path(name: str) -> str:
+    """ffmpeg / ffprobe 等外部工具的路径"""
+    if getattr(sys, 'frozen', False):
+        # 如果是打包后的应用，使用自带的工具
+        return os.path.join(os.path.dirname(sys.executable), name)
+    # 如果是开发环境，从 PATH 中查找
+    return name
+
+
+class ExtractionCancelled(subprocess.SubprocessError):
+    """提取任务已取消"""
+
+
+@dataclass
+class ExtractionProgress:
+    """异步提取的进度事件，每个标记点一个"""
+    index: int  # 标记点在输入列表中的索引
+    ok: bool
+    completed: int
+    total: int
+    success_count: int
 
 class Resolution(Enum):
     # 横版视频分辨率
@@ -27,160 +64,1207 @@ class Resolution(Enum):
         }
         return names.get(resolution, "未知分辨率")
 
+
+class FitMode(Enum):
+    """输出尺寸的适配方式"""
+    # 长边缩放到所选分辨率的长边（源视频较小时会放大）
+    TIER = 'tier'
+    # 同上，但从不放大，源视频较小时保持原尺寸
+    NO_UPSCALE = 'no_upscale'
+    # 保持源视频尺寸
+    NATIVE = 'native'
+    # 长边缩放到 long_edge 像素
+    LONG_EDGE = 'long_edge'
+    # 等比缩放到所选分辨率的框内，补黑边得到精确尺寸
+    BOX = 'box'
+
+
+@dataclass
+class OutputSpec:
+    """一种输出：分辨率、图片格式、质量（1-100，None 使用默认值）、输出子文件夹和尺寸适配方式"""
+    resolution: Resolution = Resolution.HIGH_LANDSCAPE
+    format: str = 'jpg'
+    quality: Optional[int] = None
+    subfolder: str = ''
+    fit: FitMode = FitMode.TIER
+    long_edge: Optional[int] = None
+
+    # 支持的图片格式：jpg 使用提取配置的编码器（mjpeg），png 为无损输出
+    FORMATS = ('jpg', 'png')
+
+    def __post_init__(self):
+        if self.format not in self.FORMATS:
+            raise ValueError(f"不支持的输出格式: {self.format}（可选: {', '.join(self.FORMATS)}）")
+
+    def to_dict(self) -> dict:
+        return {
+            'resolution': self.resolution.name,
+            'format': self.format,
+            'quality': self.quality,
+            'subfolder': self.subfolder,
+            'fit': self.fit.value,
+            'long_edge': self.long_edge,
+        }
+
+
+def merge_projects(projects: List[tuple[str, List[Marker]]]) -> tuple[List[Marker], List[str]]:
+    """合并多个项目的标记点，返回 (标记点列表, 每个标记点的输出子文件夹)
+
+    子文件夹取项目文件名（.fcpxmld 包取包名，重名时加序号）；只有一个项目时直接输出到输出目录。
+    """
+    markers: List[Marker] = []
+    folders: List[str] = []
+    used = set()
+    for path, project_markers in projects:
+        folder = ''
+        if len(projects) > 1:
+            stem = os.path.splitext(os.path.basename(project_path(path).rstrip(os.sep)))[0] or 'project'
+            folder, n = stem, 2
+            while folder in used:
+                folder, n = f"{stem} {n}", n + 1
+            used.add(folder)
+        markers.extend(project_markers)
+        folders.extend([folder] * len(project_markers))
+    return markers, folders
+
+
 class FrameExtractor:
-    def __init__(self, output_dir: str, resolution: Resolution = Resolution.HIGH_LANDSCAPE, high_quality: bool = True):
+    def __init__(self, output_dir: str, resolution: Resolution = Resolution.HIGH_LANDSCAPE, profile=DEFAULT_PROFILE,
+                 batch_by_video: bool = False, max_outputs_per_pass: int = 16,
+                 cache_dir: Optional[str] = None, probe_cache: Optional[MediaCache] = None,
+                 max_workers: int = 1, incremental: bool = False, prune_removed: bool = False,
+                 resume: bool = False, timeout: Optional[float] = None, backend: str = 'ffmpeg',
+                 planner: Optional[SeekPlanner] = None, use_keyframe_index: bool = False,
+                 outputs: Optional[List[OutputSpec]] = None, fit: FitMode = FitMode.TIER,
+                 long_edge: Optional[int] = None):
         self.output_dir = output_dir
-        self.resolution = resolution
-        self.high_quality = high_quality
+        # 每个标记点解码一次，按每个输出规格各写一个文件；省略时只输出 resolution 一种
+        self.outputs = list(outputs or [OutputSpec(resolution, fit=fit, long_edge=long_edge)])
+        self.resolution = self.outputs[0].resolution
+        # 提取配置（名称或 ExtractionProfile）；兼容旧的 high_quality 布尔值
+        if isinstance(profile, bool):
+            profile = 'archival' if profile else 'standard'
+        self.profile: ExtractionProfile = get_profile(profile)
+        # 批量模式：同一视频的所有标记帧在一次 ffmpeg 解码中提取
+        self.batch_by_video = batch_by_video
+        # 单次解码最多输出的帧数：滤镜图每个输出一路，路数过多时内存和耗时迅速增长
+        self.max_outputs_per_pass = max(1, max_outputs_per_pass)
+        # ffprobe 结果缓存：内存层进程内共享，指定 cache_dir 时持久化到磁盘
+        self.cache_dir = cache_dir
+        self.probe_cache = probe_cache or get_media_cache('probe', cache_dir)
+        # 并发执行的最大任务数（每个任务一个 ffmpeg 进程）
+        self.max_workers = max(1, max_workers)
+        # 增量提取：根据输出目录中的清单只处理新增或变化的标记点
+        self.incremental = incremental
+        # 增量提取时删除已不存在的标记点对应的输出文件
+        self.prune_removed = prune_removed
+        # 续传：在输出目录旁写任务日志，并据此跳过已完成的帧；关闭时不写日志，
+        # 输出目录不会被再次使用时（如每次新建的时间戳文件夹）应关闭，避免留下无用的日志文件
+        self.resume = resume
+        # 单个 ffmpeg 进程的超时时间（秒），防止卡死的进程拖住整个任务
+        self.timeout = timeout
+        # 解码后端：'ffmpeg' 调用命令行，'opencv' / 'pyav' 在进程内解码和编码
+        self.backend = backend
+        self.decoder = None if backend == 'ffmpeg' else decode_backends.create_backend(backend)
+        # 执行计划：排序标记点并决定定位还是继续解码；命令行模式每次定位要启动新进程，代价更高
+        self.planner = planner or SeekPlanner(
+            seek_cost=1.0 if self.decoder is None else 0.25,
+            max_span_outputs=self.max_outputs_per_pass
+        )
+        # 关键帧索引：每个文件扫描一次并按路径、大小和修改时间缓存
+        self.use_keyframe_index = use_keyframe_index
+        self.keyframe_cache = get_media_cache('keyframes', cache_dir)
+        # 正在运行的子进程，取消时全部结束
+        self._cancel_event = threading.Event()
+        self._processes = set()
+        self._process_lock = threading.Lock()
         
         # 获取 ffmpeg 和 ffprobe 的路径
-        if getattr(sys, 'frozen', False):
-            # ���果是打包后的应用
-            base_path = os.path.dirname(sys.executable)
-            self.ffmpeg_path = os.path.join(base_path, 'ffmpeg')
-            self.ffprobe_path = os.path.join(base_path, 'ffprobe')
-        else:
-            # 如果是开发环境
-            self.ffmpeg_path = 'ffmpeg'
-            self.ffprobe_path = 'ffprobe'
+        self.ffmpeg_path = tool_path('ffmpeg')
+        self.ffprobe_path = tool_path('ffprobe')
 
-    def get_video_info(self, video_path: str) -> dict:
-        """获取视频信息，包括宽高比"""
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """取消提取（可从其他线程调用）：不再启动新任务，并结束正在运行的 ffmpeg / ffprobe"""
+        self._cancel_event.set()
+        with self._process_lock:
+            processes = list(self._processes)
+        for process in processes:
+            try:
+                process.kill()
+            except OSError:
+                pass
+
+    def _run(self, command: List[str], text: bool = False) -> subprocess.CompletedProcess:
+        """运行子进程并登记，取消时可以结束它；行为同 subprocess.run(check=True, capture_output=True)"""
+        if self.cancelled:
+            raise ExtractionCancelled()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=text)
+        with self._process_lock:
+            self._processes.add(process)
         try:
-            command = [
-                self.ffprobe_path,
-                '-v', 'quiet',
-                '-print_format', 'json',
-                '-show_streams',
-                video_path
-            ]
-            
-            result = subprocess.run(command, capture_output=True, text=True, check=True)
-            video_info = json.loads(result.stdout)
-            
-            video_stream = next(
-                (stream for stream in video_info['streams'] if stream['codec_type'] == 'video'),
-                None
-            )
-            
-            if video_stream:
-                width = int(video_stream['width'])
-                height = int(video_stream['height'])
-                return {'width': width, 'height': height}
+            stdout, stderr = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        finally:
+            with self._process_lock:
+                self._processes.discard(process)
+        if self.cancelled:
+            raise ExtractionCancelled()
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+        return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+    def get_video_info(self, video_path: str) -> dict:
+        """获取视频信息，包括宽高比（结果按路径、大小和修改时间缓存）"""
+        cached = self.probe_cache.get(video_path)
+        if cached is not None:
+            return cached
             
-            return None
+        info = self.probe_video(video_path)
+        if info:
+            self.probe_cache.put(video_path, info)
+        return info
+
+    def probe_video(self, video_path: str) -> dict:
+        """调用 ffprobe 读取视频流信息"""
+        try:
+            result = self._run(self._probe_command(video_path), text=True)
+            return self._parse_probe_output(result.stdout)
         except Exception as e:
             print(f"获取视频信息失败: {str(e)}")
             return None
 
-    def get_output_resolution(self, video_info: dict) -> tuple[int, int]:
-        """根据原视频比例确定输出分辨率"""
-        if not video_info:
-            return self.resolution.value
-            
-        original_width = video_info['width']
-        original_height = video_info['height']
-        is_portrait = original_height > original_width
+    def _probe_command(self, video_path: str) -> List[str]:
+        return [
+            self.ffprobe_path,
+            '-v', 'quiet',
+            '-print_format', 'json',
+            '-show_streams',
+            video_path
+        ]
+
+    def _parse_probe_output(self, output: str) -> Optional[dict]:
+        video_info = json.loads(output)
+        
+        video_stream = next(
+            (stream for stream in video_info['streams'] if stream['codec_type'] == 'video'),
+            None
+        )
+        
+        if video_stream:
+            return self._stream_facts(video_stream)
+        
+        return None
+
+    @staticmethod
+    def _stream_facts(stream: dict) -> dict:
+        """从 ffprobe 的视频流信息中提取需要的字段"""
+        # 旋转角度：旧版本在 tags.rotate 中，新版本在 displaymatrix 附加数据中
+        rotation = 0
+        try:
+            rotation = int(float(stream.get('tags', {}).get('rotate', 0)))
+        except ValueError:
+            pass
+        for side_data in stream.get('side_data_list', []):
+            if 'rotation' in side_data:
+                rotation = int(float(side_data['rotation']))
         
+        def to_float(value):
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+        
+        return {
+            'width': int(stream['width']),
+            'height': int(stream['height']),
+            'rotation': rotation % 360,
+            'codec_name': stream.get('codec_name'),
+            'pix_fmt': stream.get('pix_fmt'),
+            'time_base': stream.get('time_base'),
+            'r_frame_rate': stream.get('r_frame_rate'),
+            'avg_frame_rate': stream.get('avg_frame_rate'),
+            'start_time': to_float(stream.get('start_time')),
+            'duration': to_float(stream.get('duration')),
+            'color_transfer': stream.get('color_transfer'),
+            'color_primaries': stream.get('color_primaries'),
+            'color_space': stream.get('color_space'),
+        }
+
+    def get_output_resolution(self, video_info: dict, spec: Optional[OutputSpec] = None) -> tuple[int, int]:
+        """根据原视频比例和适配方式确定输出分辨率（默认使用第一个输出规格）"""
+        return self._fit_size(video_info, spec)[1]
+
+    @staticmethod
+    def _display_size(video_info: dict) -> tuple[int, int]:
+        """画面显示尺寸（ffmpeg 会按旋转信息自动旋转画面）"""
+        width, height = video_info['width'], video_info['height']
+        if video_info.get('rotation') in (90, 270):
+            return height, width
+        return width, height
+
+    @staticmethod
+    def _long_edge_size(original_width: int, original_height: int, long_edge: int) -> tuple[int, int]:
+        """长边缩放到 long_edge，按原视频比例计算短边"""
         # 计算原始视频的宽高比
         aspect_ratio = original_height / original_width
-        
-        # 根据视频方向和设置的分辨率选择输出尺寸
-        if is_portrait:
+        if original_height > original_width:
             # 竖版视频：以高度为基准，按比例计算宽度
-            if self.resolution == Resolution.ULTRA_LANDSCAPE:
-                base_height = 3840  # 4K
-                base_width = int(base_height / aspect_ratio)
-            elif self.resolution == Resolution.HIGH_LANDSCAPE:
-                base_height = 1920  # 1080p
-                base_width = int(base_height / aspect_ratio)
-            else:
-                base_height = 1280  # 720p
-                base_width = int(base_height / aspect_ratio)
-            return (base_width, base_height)
+            return (int(long_edge / aspect_ratio), long_edge)
+        # 横版视频：以宽度为基准，按比例计算高度
+        return (long_edge, int(long_edge * aspect_ratio))
+
+    def _fit_size(self, video_info: Optional[dict],
+                  spec: Optional[OutputSpec] = None) -> tuple[Optional[tuple[int, int]], tuple[int, int]]:
+        """返回 (缩放尺寸, 输出尺寸)；缩放尺寸为 None 表示画面尺寸不变，无需缩放
+
+        没有视频信息时按所选分辨率缩放。
+        """
+        spec = spec or self.outputs[0]
+        if not video_info:
+            return spec.resolution.value, spec.resolution.value
+        
+        source = self._display_size(video_info)
+        width, height = source
+        tier_long_edge = max(spec.resolution.value)
+        
+        if spec.fit == FitMode.BOX:
+            box_width, box_height = spec.resolution.value
+            if height > width:
+                box_width, box_height = box_height, box_width
+            ratio = min(box_width / width, box_height / height)
+            content = (min(box_width, round(width * ratio)), min(box_height, round(height * ratio)))
+            return (None if content == source else content), (box_width, box_height)
+        
+        if spec.fit == FitMode.NATIVE:
+            target = source
+        elif spec.fit == FitMode.LONG_EDGE:
+            target = self._long_edge_size(width, height, spec.long_edge or tier_long_edge)
         else:
-            # 横版视频：以宽度为基准，按比例计算高度
-            if self.resolution == Resolution.ULTRA_LANDSCAPE:
-                base_width = 3840  # 4K
-                base_height = int(base_width * aspect_ratio)
-            elif self.resolution == Resolution.HIGH_LANDSCAPE:
-                base_width = 1920  # 1080p
-                base_height = int(base_width * aspect_ratio)
-            else:
-                base_width = 1280  # 720p
-                base_height = int(base_width * aspect_ratio)
-            return (base_width, base_height)
+            target = self._long_edge_size(width, height, tier_long_edge)
+            if spec.fit == FitMode.NO_UPSCALE and max(target) > max(source):
+                target = source
+        return (None if target == source else target), target
+
+    def _scale_filter(self, video_info: Optional[dict], spec: Optional[OutputSpec] = None) -> str:
+        """按输出规格和提取配置构建缩放（和锐化、补边）滤镜
+
+        尺寸不变时不缩放也不锐化，直接输出原画面。
+        """
+        scaled, canvas = self._fit_size(video_info, spec)
+        filters = []
+        if scaled is not None:
+            filters.append(f'scale={scaled[0]}:{scaled[1]}:flags={self.profile.scaler}')
+            if self.profile.sharpen:
+                amount = self.profile.sharpen
+                filters.append(f'unsharp=3:3:{amount}:3:3:{amount / 3:.2f}')
+        content = scaled or self._display_size(video_info)
+        if content != canvas:
+            filters.append(f'pad={canvas[0]}:{canvas[1]}:(ow-iw)/2:(oh-ih)/2')
+        return ','.join(filters) or 'null'
+
+    def _process_image(self, image: 'np.ndarray', spec: Optional[OutputSpec] = None) -> 'np.ndarray':
+        """进程内缩放、锐化和补边，尺寸根据解码出的画面计算（已按旋转信息校正）"""
+        scaled, canvas = self._fit_size({'width': image.shape[1], 'height': image.shape[0]}, spec)
+        return decode_backends.process_frame(image, scaled, canvas, self.profile)
+
+    def _input_options(self) -> List[str]:
+        """解码参数"""
+        if self.profile.threads:
+            return ['-threads', str(self.profile.threads)]
+        return []
+
+    def _output_options(self, spec: Optional[OutputSpec] = None) -> List[str]:
+        """构建输出参数，输出规格指定的质量优先于提取配置"""
+        spec = spec or self.outputs[0]
+        if spec.format == 'png':
+            return []
+        profile = self.profile
+        if spec.quality is not None:
+            profile = replace(profile, quality=spec.quality)
+        options = ['-c:v', profile.encoder, '-q:v', str(profile.qscale)]
+        if profile.qscale == 1:
+            # mjpeg 的 qmin 默认为 2，需要放开才能使用最高质量
+            options += ['-qmin', '1', '-qmax', '1']
+        return options
+
+    def _settings_signature(self) -> dict:
+        """影响输出内容的提取设置，设置变化时增量提取会重新处理所有标记点"""
+        return {
+            'outputs': [spec.to_dict() for spec in self.outputs],
+            'profile': self.profile.name,
+            'backend': self.backend,
+        }
+
+    def _output_path(self, output_filename: str, spec: Optional[OutputSpec] = None) -> str:
+        """输出名可带相对目录（如多项目批量时的项目文件夹），规格子文件夹位于该目录之内"""
+        spec = spec or self.outputs[0]
+        folder, filename = os.path.split(output_filename)
+        return os.path.join(self.output_subdir, folder, spec.subfolder, f"{filename}.{spec.format}")
+
+    def _output_paths(self, output_filename: str) -> List[str]:
+        """一个标记点在各输出规格下的文件路径"""
+        return [self._output_path(output_filename, spec) for spec in self.outputs]
+
+    def _outputs_valid(self, output_filename: str) -> bool:
+        return all(is_valid_output(path) for path in self._output_paths(output_filename))
+
+    def _output_branches(self, source: str, video_info: Optional[dict], label: str) -> tuple[List[str], List[str]]:
+        """将一路画面按各输出规格缩放，返回 (滤镜链列表, 输出标签列表)"""
+        scales = [self._scale_filter(video_info, spec) for spec in self.outputs]
+        if len(scales) == 1:
+            return [f'{source}{scales[0]}[{label}0]'], [f'[{label}0]']
+        # 多个输出共用一次解码，拆分后分别缩放
+        splits = ''.join(f'[{label}s{k}]' for k in range(len(scales)))
+        chains = [f'{source}split={len(scales)}{splits}']
+        chains += [f'[{label}s{k}]{scale}[{label}{k}]' for k, scale in enumerate(scales)]
+        return chains, [f'[{label}{k}]' for k in range(len(scales))]
+
+    def _safe_filename(self, marker: Marker) -> str:
+        """清理文件名"""
+        safe_name = "".join(c for c in marker.name if c.isalnum() or c in (' ', '-', '_')).strip()
+        if not safe_name:
+            safe_name = f"marker_{marker.frame_id}"
+        return safe_name
 
     def extract_frame(self, video_path: str, timestamp: float, output_filename: str) -> bool:
         """从视频中提取指定时间点的帧"""
         try:
-            output_path = os.path.join(self.output_subdir, f"{output_filename}.jpg")
-            
             video_info = self.get_video_info(video_path)
-            width, height = self.get_output_resolution(video_info)
+            command = self._frame_command(video_path, timestamp, output_filename, video_info)
             
-            if self.high_quality:
-                # 高质量设置
-                command = [
-                    self.ffmpeg_path,
-                    '-ss', str(timestamp),
-                    '-i', video_path,
-                    '-vframes', '1',
-                    '-q:v', '1',
-                    '-compression_level', '0',
-                    '-vf', (f'scale={width}:{height}:flags=lanczos,'
-                           'unsharp=3:3:1.5:3:3:0.5'),
-                    '-preset', 'veryslow',
-                    '-qmin', '1',
-                    '-qmax', '1',
+            self._run(command)
+            return True
+        except ExtractionCancelled:
+            return False
+        except subprocess.SubprocessError as e:
+            print(f"提取帧失败: {str(e)}")
+            return False
+
+    def _frame_command(self, video_path: str, timestamp: float, output_filename: str,
+                       video_info: Optional[dict]) -> List[str]:
+        """提取单帧的 ffmpeg 命令"""
+        if len(self.outputs) == 1:
+            return [
+                self.ffmpeg_path,
+                *self._input_options(),
+                '-ss', str(timestamp),
+                '-i', video_path,
+                '-vframes', '1',
+                *self._output_options(),
+                '-vf', self._scale_filter(video_info),
+                '-y',
+                self._output_path(output_filename)
+            ]
+        
+        chains, labels = self._output_branches('[0:v]', video_info, 'o')
+        command = [
+            self.ffmpeg_path,
+            *self._input_options(),
+            '-ss', str(timestamp),
+            '-i', video_path,
+            '-filter_complex', ';'.join(chains),
+        ]
+        for spec, label in zip(self.outputs, labels):
+            command += [
+                '-map', label,
+                '-frames:v', '1',
+                *self._output_options(spec),
+                '-y',
+                self._output_path(output_filename, spec)
+            ]
+        return command
+
+    def _keyframes(self, video_path: str, target_count: int) -> Optional[KeyframeIndex]:
+        """视频的关键帧索引，未启用或无法获取时返回 None
+
+        扫描需要解复用整个文件，只有一个目标时规划无从选择，不扫描。
+        """
+        if not self._wants_keyframes(target_count):
+            return None
+        return self.get_keyframe_index(video_path)
+
+    def _wants_keyframes(self, target_count: int) -> bool:
+        """是否值得为 target_count 个目标扫描关键帧"""
+        return self.use_keyframe_index and target_count >= 2 and not self.cancelled
+
+    def get_keyframe_index(self, video_path: str) -> Optional[KeyframeIndex]:
+        """获取关键帧索引，缓存中没有时扫描文件并写入缓存"""
+        cached = self.keyframe_cache.get(video_path)
+        if cached is not None:
+            return KeyframeIndex.from_dict(cached)
+            
+        index = self.build_keyframe_index(video_path)
+        if index is not None:
+            self.keyframe_cache.put(video_path, index.to_dict())
+        return index
+
+    def build_keyframe_index(self, video_path: str) -> Optional[KeyframeIndex]:
+        """扫描数据包的关键帧标志（只解复用，不解码）"""
+        index = self._scan_in_process(video_path)
+        if index is not None:
+            return index
+            
+        try:
+            result = self._run(self._keyframe_command(video_path), text=True)
+        except ExtractionCancelled:
+            return None
+        except Exception as e:
+            print(f"扫描关键帧失败: {str(e)}")
+            return None
+        
+        video_info = self.get_video_info(video_path) or {}
+        return self._parse_keyframes(result.stdout, video_info.get('start_time') or 0.0)
+
+    def _scan_in_process(self, video_path: str) -> Optional[KeyframeIndex]:
+        """进程内模式优先使用 PyAV 扫描，不启动子进程"""
+        if self.decoder is None:
+            return None
+        scanned = decode_backends.scan_keyframes(video_path)
+        if scanned is None:
+            return None
+        times, count = scanned
+        return KeyframeIndex(times, all_intra=len(times) == count)
+
+    def _keyframe_command(self, video_path: str) -> List[str]:
+        return [
+            self.ffprobe_path,
+            '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,flags',
+            '-of', 'csv=print_section=0',
+            video_path
+        ]
+
+    @staticmethod
+    def _parse_keyframes(output: str, start: float) -> Optional[KeyframeIndex]:
+        """解析 ffprobe 数据包列表，关键帧时间相对文件起点，与定位时间一致"""
+        times = []
+        count = 0
+        for line in output.splitlines():
+            pts_time, _, flags = line.partition(',')
+            try:
+                pts = float(pts_time)
+            except ValueError:
+                continue
+            count += 1
+            if 'K' in flags:
+                times.append(pts - start)
+        
+        if count == 0:
+            return None
+        return KeyframeIndex(times, all_intra=len(times) == count)
+
+    def extract_video_frames(self, video_path: str, items: List[tuple[float, str]]) -> List[bool]:
+        """在尽量少的解码过程中提取同一视频的多个帧
+
+        items 为 (时间戳, 输出文件名) 列表，返回与之对应的成功标记列表。
+        由 SeekPlanner 将时间点划分为若干解码段，每段一次 ffmpeg 解码。
+        """
+        results = [False] * len(items)
+        spans = self.planner.plan_times([t for t, _ in items], self._keyframes(video_path, len(items)))
+        for span in spans:
+            span_results = self._extract_span(video_path, [items[i] for i in span.indices])
+            for i, ok in zip(span.indices, span_results):
+                results[i] = ok
+        return results
+
+    def _extract_span(self, video_path: str, items: List[tuple[float, str]]) -> List[bool]:
+        """一次 ffmpeg 解码：从最早的时间点定位，向前解码取出所有目标帧"""
+        if not items:
+            return []
+            
+        command, output_paths = self._prepare_span(video_path, items, self.get_video_info(video_path))
+        try:
+            self._run(command)
+        except ExtractionCancelled:
+            pass
+        except subprocess.SubprocessError as e:
+            print(f"批量提取帧失败: {str(e)}")
+        
+        return [self._span_outputs_written(paths) for paths in output_paths]
+
+    @staticmethod
+    def _span_outputs_written(paths: List[str]) -> bool:
+        return all(os.path.exists(path) and os.path.getsize(path) > 0 for path in paths)
+
+    def _prepare_span(self, video_path: str, items: List[tuple[float, str]],
+                      video_info: Optional[dict]) -> tuple[List[str], List[List[str]]]:
+        """构建一次解码提取多帧的 ffmpeg 命令并删除旧的输出文件
+
+        返回 (命令, 每个目标在各输出规格下的路径列表)。
+        """
+        base = min(t for t, _ in items)
+        
+        # 一路解码，拆分为多路，每路选取第一帧不早于目标时间的画面，再按各输出规格缩放；
+        # trim 在取到该帧后立即结束这一路，否则之后的每一帧都会被继续缩放和缓存，直到整段最后一帧输出
+        labels = ''.join(f'[s{j}]' for j in range(len(items)))
+        graph = [f'[0:v]split={len(items)}{labels}']
+        branch_labels = []
+        for j, (timestamp, _) in enumerate(items):
+            chains, outputs = self._output_branches(
+                f"[s{j}]select='gte(t,{timestamp - base:.6f})',trim=end_frame=1,", video_info, f'o{j}_'
+            )
+            graph += chains
+            branch_labels.append(outputs)
+        
+        command = [
+            self.ffmpeg_path,
+            *self._input_options(),
+            '-ss', str(base),
+            '-i', video_path,
+            '-filter_complex', ';'.join(graph),
+        ]
+        output_paths = []
+        for (_, output_filename), outputs in zip(items, branch_labels):
+            paths = []
+            for spec, label in zip(self.outputs, outputs):
+                output_path = self._output_path(output_filename, spec)
+                paths.append(output_path)
+                # 删除旧文件，以便根据输出文件判断每一帧是否成功
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                command += [
+                    '-map', label,
+                    '-frames:v', '1',
+                    *self._output_options(spec),
                     '-y',
                     output_path
                 ]
+            output_paths.append(paths)
+        return command, output_paths
+
+    def extract_video_frames_in_process(self, video_path: str, items: List[tuple[float, str]],
+                                        spans: Optional[List[List[int]]] = None) -> List[bool]:
+        """使用进程内解码后端提取同一视频的多个帧，全程不启动子进程
+
+        spans 为执行计划（每段为 items 的索引），省略时由 SeekPlanner 生成。
+        """
+        results = [False] * len(items)
+        times = [t for t, _ in items]
+        if spans is None:
+            spans = [span.indices for span in self.planner.plan_times(times, self._keyframes(video_path, len(times)))]
+        for index, image in self.decoder.frames(video_path, times, spans):
+            if self.cancelled:
+                break
+            ok = True
+            for spec in self.outputs:
+                output = self._process_image(image, spec)
+                quality = spec.quality if spec.quality is not None else self.profile.quality
+                ok = decode_backends.encode_frame(output, self._output_path(items[index][1], spec), quality) and ok
+            results[index] = ok
+        return results
+
+    def iter_frame_arrays(self, markers: List[Marker]) -> Iterator[tuple[Marker, 'np.ndarray']]:
+        """解码标记点对应的帧并直接产出 (标记点, BGR 图像)，不写入任何文件
+
+        图像尺寸由 get_output_resolution 决定，缩放和锐化与写文件时相同。
+        命令行模式通过 ffmpeg rawvideo 管道读取，进程内模式直接使用解码后端。
+        按执行计划的顺序产出（同一视频的标记点按时间排列），无法解码的标记点不会产出。
+        """
+        if decode_backends.np is None:
+            raise RuntimeError("需要安装 numpy 才能将帧读取到内存")
+        
+        # 逐个视频扫描关键帧并规划，第一帧不必等待所有视频扫描完毕
+        for video_path, group in self._group_by_video(markers, range(len(markers))).items():
+            keyframes = self._keyframes(video_path, len(group))
+            plan = self.planner.plan(markers, group, {video_path: keyframes})[0]
+            if self.decoder is not None:
+                indices = plan.indices
+                times = [markers[i].seek_time for i in indices]
+                local_spans, pos = [], 0
+                for span in plan.spans:
+                    local_spans.append(list(range(pos, pos + len(span.indices))))
+                    pos += len(span.indices)
+                for j, image in self.decoder.frames(plan.video_path, times, local_spans):
+                    if self.cancelled:
+                        return
+                    yield markers[indices[j]], self._process_image(image)
+                continue
+            
+            video_info = self.get_video_info(plan.video_path)
+            for span in plan.spans:
+                times = [markers[i].seek_time for i in span.indices]
+                for j, image in self._pipe_span(plan.video_path, times, video_info):
+                    yield markers[span.indices[j]], image
+
+    def create_frame_ring(self, markers: List[Marker], slot_count: int = 8, context=None) -> SharedFrameRing:
+        """按这些标记点的最大输出尺寸创建共享内存帧缓冲环"""
+        slot_size = 0
+        for video_path in {marker.video_path for marker in markers}:
+            video_info = self.get_video_info(video_path)
+            if video_info:
+                width, height = self.get_output_resolution(video_info)
             else:
-                # 标准质量设置
-                command = [
-                    self.ffmpeg_path,
-                    '-ss', str(timestamp),
-                    '-i', video_path,
-                    '-vframes', '1',
-                    '-q:v', '3',
-                    '-vf', f'scale={width}:{height}',
-                    '-y',
-                    output_path
-                ]
+                # 无法获取视频信息时按最不利的宽高比预留（任意比例的输出都不超过长边的平方）
+                width = height = max(self.resolution.value)
+            slot_size = max(slot_size, width * height * 3)
+        return SharedFrameRing(slot_count, slot_size or 1, context)
+
+    def share_frames(self, markers: List[Marker], ring: SharedFrameRing,
+                     timeout: Optional[float] = None) -> Iterator[FrameDescriptor]:
+        """解码标记点对应的帧并写入共享内存帧缓冲环，产出可以发送给消费进程的描述
+
+        环中没有空闲槽位时等待消费者释放（最多 timeout 秒）。
+        """
+        for marker, image in self.iter_frame_arrays(markers):
+            yield ring.write(marker, image, timeout)
+
+    def _pipe_span(self, video_path: str, times: List[float],
+                   video_info: Optional[dict]) -> Iterator[tuple[int, 'np.ndarray']]:
+        """一次 ffmpeg 解码，将按时间排序的各目标帧以 rawvideo 输出到管道，产出 (索引, 图像)"""
+        np = decode_backends.np
+        width, height = self.get_output_resolution(video_info)
+        scale = self._scale_filter(video_info)
+        base = times[0]
+        
+        # 每路只保留第一帧不早于目标时间的画面，再按顺序拼接为一路输出
+        labels = ''.join(f'[s{j}]' for j in range(len(times)))
+        outputs = ''.join(f'[v{j}]' for j in range(len(times)))
+        graph = [f'[0:v]split={len(times)}{labels}']
+        for j, timestamp in enumerate(times):
+            graph.append(f"[s{j}]select='gte(t,{timestamp - base:.6f})',trim=end_frame=1,{scale}[v{j}]")
+        graph.append(f'{outputs}concat=n={len(times)}:v=1:a=0,format=bgr24[out]')
+        
+        command = [
+            self.ffmpeg_path,
+            '-v', 'error',
+            *self._input_options(),
+            '-ss', str(base),
+            '-i', video_path,
+            '-filter_complex', ';'.join(graph),
+            '-map', '[out]',
+            # 拼接后的时间戳不连续，禁止按帧率补帧或丢帧
+            '-vsync', 'passthrough',
+            '-f', 'rawvideo',
+            'pipe:1'
+        ]
+        
+        frame_size = width * height * 3
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"提取帧失败: {str(e)}")
+            return
+        with self._process_lock:
+            self._processes.add(process)
+        try:
+            # 目标时间有序，视频提前结束时缺少的只会是末尾的目标
+            for j in range(len(times)):
+                data = process.stdout.read(frame_size)
+                if len(data) < frame_size:
+                    break
+                yield j, np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+        finally:
+            with self._process_lock:
+                self._processes.discard(process)
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+
+    @staticmethod
+    def _group_by_video(markers: List[Marker], indices) -> Dict[str, List[int]]:
+        """按视频分组标记点索引，视频按首次出现的顺序排列"""
+        groups: Dict[str, List[int]] = {}
+        for i in indices:
+            groups.setdefault(markers[i].video_path, []).append(i)
+        return groups
+
+    def _plan_video(self, markers: List[Marker], video_path: str,
+                    indices: List[int]) -> List[tuple[str, List[List[int]]]]:
+        """将同一视频待提取的标记点划分为执行单元 (视频路径, 解码段列表)，每段为标记点索引列表
+
+        可能需要扫描关键帧，在线程池中调用，各视频的扫描互不等待。
+        """
+        if not self.batch_by_video and self.decoder is None:
+            return [(video_path, [[i]]) for i in indices]
+        keyframes = self._keyframes(video_path, len(indices))
+        return self._plan_units(markers, video_path, indices, keyframes)
+
+    def _plan_units(self, markers: List[Marker], video_path: str, indices: List[int],
+                    keyframes: Optional[KeyframeIndex]) -> List[tuple[str, List[List[int]]]]:
+        """根据关键帧索引生成同一视频的执行单元"""
+        plan = self.planner.plan(markers, indices, {video_path: keyframes})[0]
+        if self.decoder is None:
+            # 命令行模式：每个解码段一个 ffmpeg 进程，不同段可以并行
+            return [(video_path, [span.indices]) for span in plan.spans]
+        # 进程内模式：一个视频的多个解码段共用一次打开，按输出数量分组以便并行
+        units = []
+        group, count = [], 0
+        for span in plan.spans:
+            if group and count + len(span.indices) > self.max_outputs_per_pass:
+                units.append((video_path, group))
+                group, count = [], 0
+            group.append(span.indices)
+            count += len(span.indices)
+        if group:
+            units.append((video_path, group))
+        return units
+
+    def _run_unit(self, markers: List[Marker], names: List[str], video_path: str,
+                  spans: List[List[int]]) -> List[bool]:
+        """执行单个单元，返回结果与各段索引展开后的顺序一致"""
+        indices = [i for span in spans for i in span]
+        if self.cancelled:
+            return [False] * len(indices)
+        items = [(markers[i].seek_time, names[i]) for i in indices]
+        if self.decoder is not None:
+            # 将标记点索引转换为 items 中的位置
+            local_spans, pos = [], 0
+            for span in spans:
+                local_spans.append(list(range(pos, pos + len(span))))
+                pos += len(span)
+            return self.extract_video_frames_in_process(video_path, items, local_spans)
+        if self.batch_by_video:
+            return self._extract_span(video_path, items)
+        return [self.extract_frame(video_path, t, name) for t, name in items]
+
+    @staticmethod
+    def _winners(names: List[str]) -> Dict[str, int]:
+        """同名标记点按顺序处理时后者覆盖前者，返回每个输出名最终生效的标记点索引"""
+        winner = {}
+        for i, name in enumerate(names):
+            winner[name] = i
+        return winner
+
+    def _decode_targets(self, markers: List[Marker], names: List[str],
+                        written: Dict[str, bool]) -> tuple[Dict[str, List[int]], Dict[int, List[int]]]:
+        """选出需要解码的标记点，返回 (按视频分组的标记点索引, 解码后需要复制输出的标记点)
+
+        written 中的输出视为已完成；同名标记点只提取最后一个。
+        """
+        winner = self._winners(names)
+        targets = [i for i, name in enumerate(names) if winner[name] == i and name not in written]
+        # 同一视频同一时间的标记点（如多个项目引用同一素材）只解码一次，其余输出复制结果
+        copies: Dict[int, List[int]] = {}
+        first_at: Dict[tuple, int] = {}
+        for i in targets:
+            key = (markers[i].video_path, markers[i].seek_time)
+            if key in first_at:
+                copies.setdefault(first_at[key], []).append(i)
+            else:
+                first_at[key] = i
+        return self._group_by_video(markers, first_at.values()), copies
+
+    def _extract_scheduled(self, markers: List[Marker], names: List[str], progress_callback=None,
+                           done: Optional[Dict[str, bool]] = None, result_callback=None) -> Dict[str, bool]:
+        """按执行单元提取（批量模式和/或并行模式）
+
+        done 中的输出视为已完成，不再提取；每个输出完成后调用 result_callback(索引, 是否成功)。
+        返回每个输出名是否成功。
+        """
+        total_markers = len(markers)
+        written = dict(done or {})
+        groups, copies = self._decode_targets(markers, names, written)
+        
+        success_count = 0
+        reported = 0
+        
+        def report_progress():
+            # 按标记点原始顺序汇报进度，保证回调序列与顺序执行一致
+            nonlocal success_count, reported
+            while reported < total_markers and names[reported] in written:
+                if written[names[reported]]:
+                    success_count += 1
+                reported += 1
+                if progress_callback:
+                    progress_callback(reported, total_markers, success_count)
+        
+        report_progress()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # 各视频的规划（可能需要扫描关键帧）也在线程池中进行，规划完成即提交其执行单元
+            planning = {
+                executor.submit(self._plan_video, markers, video_path, indices): indices
+                for video_path, indices in groups.items()
+            }
+            unit_indices: Dict[Future, List[int]] = {}
+            pending = set(planning)
             
-            subprocess.run(command, check=True, capture_output=True)
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future in planning:
+                        try:
+                            units = future.result()
+                        except Exception as e:
+                            print(f"规划提取失败: {str(e)}")
+                            units = [(markers[i].video_path, [[i]]) for i in planning[future]]
+                        for video_path, spans in units:
+                            unit = executor.submit(self._run_unit, markers, names, video_path, spans)
+                            unit_indices[unit] = [i for span in spans for i in span]
+                            pending.add(unit)
+                        continue
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        print(f"提取帧失败: {str(e)}")
+                        results = [False] * len(unit_indices[future])
+                    for i, ok in self._unit_results(unit_indices[future], results, names, copies, written):
+                        if result_callback:
+                            result_callback(i, ok)
+                    report_progress()
+        
+        return written
+
+    def _unit_results(self, indices: List[int], results: List[bool], names: List[str],
+                      copies: Dict[int, List[int]], written: Dict[str, bool]) -> List[tuple[int, bool]]:
+        """将执行单元的结果写入 written，并为同一视频同一时间的其他标记点复制输出
+
+        返回结果已确定的 (标记点索引, 是否成功)。
+        """
+        outcomes = []
+        for i, ok in zip(indices, results):
+            if not ok and self.cancelled:
+                # 取消后未运行或被中断的帧不算失败，保持未处理状态
+                continue
+            written[names[i]] = ok
+            outcomes.append((i, ok))
+            for j in copies.get(i, []):
+                copied = ok and self._copy_outputs(names[i], names[j])
+                written[names[j]] = copied
+                outcomes.append((j, copied))
+        return outcomes
+
+    def _copy_outputs(self, source_name: str, target_name: str) -> bool:
+        """将已提取的输出复制为另一个输出名"""
+        try:
+            for source, target in zip(self._output_paths(source_name), self._output_paths(target_name)):
+                shutil.copyfile(source, target)
             return True
-        except subprocess.CalledProcessError as e:
-            print(f"提取帧失败: {str(e)}")
+        except OSError as e:
+            print(f"复制输出失败 {target_name}: {str(e)}")
             return False
 
-    def extract_frames(self, markers: List[Marker], progress_callback=None) -> int:
-        """提取所有标记点对应的帧"""
-        success_count = 0
-        total_markers = len(markers)
+    def _current_outputs(self, manifest: ExtractionManifest, markers: List[Marker], names: List[str],
+                         settings: dict) -> Dict[str, bool]:
+        """清单中记录且未变化的输出"""
+        done = {}
+        for name, i in self._winners(names).items():
+            if manifest.is_current(name, markers[i], settings, self._output_paths(name)):
+                done[name] = True
+        return done
+
+    def _journaled_outputs(self, journal: ExtractionJournal, markers: List[Marker], names: List[str],
+                           settings: dict) -> Dict[str, bool]:
+        """任务日志中已完成、标记点未变且文件完整的输出"""
+        completed = journal.completed(settings)
+        done = {}
+        for name, i in self._winners(names).items():
+            if (completed.get(name) == marker_identity(markers[i])
+                    and self._outputs_valid(name)):
+                done[name] = True
+        return done
+
+    def _update_manifest(self, manifest: ExtractionManifest, markers: List[Marker], names: List[str],
+                         written: Dict[str, bool], settings: dict):
+        """根据本次结果更新清单，可选删除已移除标记点的输出"""
+        if manifest.settings != settings:
+            manifest.entries = {}
+        manifest.settings = settings
         
+        winner = self._winners(names)
+        for name, i in winner.items():
+            if written.get(name):
+                manifest.entries[name] = {
+                    'marker': marker_identity(markers[i]),
+                    'files': [os.path.relpath(path, self.output_subdir) for path in self._output_paths(name)],
+                }
+            else:
+                manifest.entries.pop(name, None)
+        
+        if self.prune_removed:
+            for name in [name for name in manifest.entries if name not in winner]:
+                for file in manifest.entries.pop(name)['files']:
+                    output_path = os.path.join(self.output_subdir, file)
+                    try:
+                        if os.path.exists(output_path):
+                            os.remove(output_path)
+                    except OSError as e:
+                        print(f"删除过期输出失败: {str(e)}")
+        
+        manifest.save()
+
+    def _prepare_job(self, markers: List[Marker], folders: Optional[List[str]] = None):
+        """准备提取任务，返回 (输出名列表, 清单, 已完成的输出, 设置, 任务日志)"""
         # 直接使用传入的输出目录，不再创建子文件夹
         self.output_subdir = self.output_dir
         
-        for i, marker in enumerate(markers, 1):
-            # 清理文件名
-            safe_name = "".join(c for c in marker.name if c.isalnum() or c in (' ', '-', '_')).strip()
-            if not safe_name:
-                safe_name = f"marker_{marker.frame_id}"
-                
-            if self.extract_frame(marker.video_path, marker.timestamp, safe_name):
-                success_count += 1
+        folders = folders or [''] * len(markers)
+        for folder in dict.fromkeys(folders):
+            for spec in self.outputs:
+                os.makedirs(os.path.join(self.output_subdir, folder, spec.subfolder), exist_ok=True)
+        
+        names = [os.path.join(folder, self._safe_filename(marker)) for marker, folder in zip(markers, folders)]
+        
+        manifest = None
+        done = {}
+        settings = self._settings_signature()
+        if self.incremental:
+            manifest = ExtractionManifest(self.output_dir).load()
+            done = self._current_outputs(manifest, markers, names, settings)
+        
+        journal = ExtractionJournal(self.output_dir)
+        if self.resume:
+            done.update(self._journaled_outputs(journal, markers, names, settings))
+        return names, manifest, done, settings, journal
+
+    def extract_frames(self, markers: List[Marker], progress_callback=None, open_output_dir: bool = True,
+                       marker_callback=None, folders: Optional[List[str]] = None) -> int:
+        """提取所有标记点对应的帧，完成后默认打开输出文件夹
+
+        marker_callback(索引, 是否成功) 在每个标记点的结果确定后立即调用（不保证顺序），
+        已提取过而跳过的标记点视为成功。
+        folders 为每个标记点相对输出目录的子文件夹，用于把多个项目合并为一个任务：
+        同一视频的标记点无论来自哪个项目都一起规划解码，输出仍按项目分开。
+        """
+        success_count = 0
+        total_markers = len(markers)
+        
+        names, manifest, done, settings, journal = self._prepare_job(markers, folders)
+        
+        if (self.batch_by_video or self.max_workers > 1 or self.incremental or self.resume
+                or self.decoder is not None):
+            # 同名标记点共用一个输出，结果也相同
+            sharing: Dict[str, List[int]] = {}
+            for i, name in enumerate(names):
+                sharing.setdefault(name, []).append(i)
+            
+            def record(i, ok):
+                journal.record(names[i], markers[i], ok)
+                if marker_callback:
+                    for j in sharing[names[i]]:
+                        marker_callback(j, ok)
             
-            # 更新进度
-            if progress_callback:
-                progress_callback(i, total_markers, success_count)
+            if marker_callback:
+                for name in done:
+                    for j in sharing[name]:
+                        marker_callback(j, True)
+            if self.resume:
+                journal.open(settings, total_markers, resume=True)
+            try:
+                written = self._extract_scheduled(
+                    markers, names, progress_callback, done, result_callback=record
+                )
+            except BaseException:
+                journal.close(finished=False)
+                raise
+            success_count = sum(1 for name in names if written.get(name))
+            # 全部成功后任务日志不再需要
+            journal.close(finished=success_count == total_markers)
+            if manifest is not None:
+                self._update_manifest(manifest, markers, names, written, settings)
+        else:
+            for i, (marker, safe_name) in enumerate(zip(markers, names), 1):
+                if self.cancelled:
+                    break
+                ok = self.extract_frame(marker.video_path, marker.seek_time, safe_name)
+                if not ok and self.cancelled:
+                    break
+                if ok:
+                    success_count += 1
+                if marker_callback:
+                    marker_callback(i - 1, ok)
+                
+                # 更新进度
+                if progress_callback:
+                    progress_callback(i, total_markers, success_count)
         
         # 在 macOS 中打开输出文件夹
-        try:
-            subprocess.run(['open', self.output_dir])
-        except Exception as e:
-            print(f"打开输出文件夹失败: {str(e)}")
+        if open_output_dir and not self.cancelled:
+            try:
+                subprocess.run(['open', self.output_dir])
+            except Exception as e:
+                print(f"打开输出文件夹失败: {str(e)}")
                 
         # 只返回成功计数
-        return success_count
\ No newline at end of file
+        return success_count
+
+    async def _run_async(self, command: List[str]) -> Optional[bytes]:
+        """以 asyncio 子进程运行命令，返回标准输出；失败或超时返回 None，取消时结束子进程"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        except OSError as e:
+            print(f"无法启动 {command[0]}: {str(e)}")
+            return None
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+        except BaseException as e:
+            # 超时或任务被取消：不留下孤立的 ffmpeg 进程
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            if isinstance(e, asyncio.TimeoutError):
+                print(f"命令超时: {' '.join(command[:1])}")
+                return None
+            raise
+        if process.returncode != 0:
+            print(f"命令执行失败 ({process.returncode}): {stderr.decode(errors='replace').strip()[-200:]}")
+            return None
+        return stdout
+
+    async def get_video_info_async(self, video_path: str) -> Optional[dict]:
+        """get_video_info 的异步版本，共用同一个缓存"""
+        cached = self.probe_cache.get(video_path)
+        if cached is not None:
+            return cached
+        
+        output = await self._run_async(self._probe_command(video_path))
+        if output is None:
+            return None
+        try:
+            info = self._parse_probe_output(output.decode())
+        except (ValueError, KeyError) as e:
+            print(f"获取视频信息失败: {str(e)}")
+            return None
+        if info:
+            self.probe_cache.put(video_path, info)
+        return info
+
+    async def get_keyframe_index_async(self, video_path: str) -> Optional[KeyframeIndex]:
+        """get_keyframe_index 的异步版本，ffprobe 通过 asyncio 子进程运行，共用同一个缓存"""
+        cached = self.keyframe_cache.get(video_path)
+        if cached is not None:
+            return KeyframeIndex.from_dict(cached)
+        
+        index = None
+        if self.decoder is not None:
+            index = await asyncio.to_thread(self._scan_in_process, video_path)
+        if index is None:
+            output = await self._run_async(self._keyframe_command(video_path))
+            if output is None:
+                return None
+            video_info = await self.get_video_info_async(video_path) or {}
+            index = self._parse_keyframes(output.decode(), video_info.get('start_time') or 0.0)
+        if index is not None:
+            self.keyframe_cache.put(video_path, index.to_dict())
+        return index
+
+    async def _plan_video_async(self, markers: List[Marker], video_path: str,
+                                indices: List[int]) -> List[tuple[str, List[List[int]]]]:
+        """_plan_video 的异步版本"""
+        if not self.batch_by_video and self.decoder is None:
+            return [(video_path, [[i]]) for i in indices]
+        keyframes = None
+        if self._wants_keyframes(len(indices)):
+            keyframes = await self.get_keyframe_index_async(video_path)
+        return self._plan_units(markers, video_path, indices, keyframes)
+
+    async def _run_unit_async(self, markers: List[Marker], names: List[str], video_path: str,
+                              spans: List[List[int]], video_info: Optional[dict]) -> List[bool]:
+        """异步执行单个单元，结果顺序与 _run_unit 一致"""
+        if self.decoder is not None:
+            # 进程内解码没有子进程可等待，放到线程中执行
+            return await asyncio.to_thread(self._run_unit, markers, names, video_path, spans)
+        
+        items = [(markers[i].seek_time, names[i]) for span in spans for i in span]
+        if self.batch_by_video:
+            command, output_paths = self._prepare_span(video_path, items, video_info)
+            await self._run_async(command)
+            return [self._span_outputs_written(paths) for paths in output_paths]
+        
+        results = []
+        for timestamp, name in items:
+            command = self._frame_command(video_path, timestamp, name, video_info)
+            results.append(await self._run_async(command) is not None)
+        return results
+
+    async def extract_frames_async(self, markers: List[Marker], max_concurrency: Optional[int] = None,
+                                   folders: Optional[List[str]] = None) -> AsyncIterator[ExtractionProgress]:
+        """extract_frames 的异步版本，以异步迭代器按完成顺序产出每个标记点的进度
+
+        ffprobe / ffmpeg 通过 asyncio 子进程运行，同时运行的任务数不超过 max_concurrency
+        （默认 max_workers）。取消迭代任务或提前结束迭代时，会结束所有正在运行的子进程。
+        支持增量提取、续传和 folders（与 extract_frames 相同）；不会打开输出文件夹。
+        """
+        total_markers = len(markers)
+        names, manifest, done, settings, journal = self._prepare_job(markers, folders)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or self.max_workers))
+        
+        # 同名标记点共用一个输出，结果也相同
+        sharing: Dict[str, List[int]] = {}
+        for i, name in enumerate(names):
+            sharing.setdefault(name, []).append(i)
+        written = dict(done)
+        groups, copies = self._decode_targets(markers, names, written)
+        video_infos: Dict[str, asyncio.Task] = {}
+        
+        async def plan(video_path: str, indices: List[int]):
+            # 规划可能需要扫描关键帧，同样计入并发数
+            async with semaphore:
+                return await self._plan_video_async(markers, video_path, indices)
+        
+        async def run(video_path: str, spans: List[List[int]]):
+            async with semaphore:
+                if self.decoder is None and video_path not in video_infos:
+                    video_infos[video_path] = asyncio.ensure_future(self.get_video_info_async(video_path))
+                video_info = await video_infos[video_path] if self.decoder is None else None
+                return await self._run_unit_async(markers, names, video_path, spans, video_info)
+        
+        completed = 0
+        success_count = 0
+        
+        def finish(name: str, ok: bool) -> List[ExtractionProgress]:
+            nonlocal completed, success_count
+            events = []
+            for i in sharing[name]:
+                completed += 1
+                success_count += ok
+                events.append(ExtractionProgress(i, ok, completed, total_markers, success_count))
+            return events
+        
+        if self.resume:
+            journal.open(settings, total_markers, resume=True)
+        # 各视频规划完成即创建其执行单元的任务
+        planning = {
+            asyncio.ensure_future(plan(video_path, indices)): indices
+            for video_path, indices in groups.items()
+        }
+        tasks: Dict[asyncio.Future, List[int]] = {}
+        try:
+            for name in done:
+                for event in finish(name, True):
+                    yield event
+            
+            pending = set(planning)
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    if task in planning:
+                        try:
+                            units = task.result()
+                        except Exception as e:
+                            print(f"规划提取失败: {str(e)}")
+                            units = [(markers[i].video_path, [[i]]) for i in planning[task]]
+                        for video_path, spans in units:
+                            unit = asyncio.ensure_future(run(video_path, spans))
+                            tasks[unit] = [i for span in spans for i in span]
+                            pending.add(unit)
+                        continue
+                    try:
+                        results = task.result()
+                    except Exception as e:
+                        print(f"提取帧失败: {str(e)}")
+                        results = [False] * len(tasks[task])
+                    for i, ok in self._unit_results(tasks[task], results, names, copies, written):
+                        journal.record(names[i], markers[i], ok)
+                        for event in finish(names[i], ok):
+                            yield event
+        except BaseException:
+            for task in (*planning, *tasks):
+                task.cancel()
+            await asyncio.gather(*planning, *tasks, *video_infos.values(), return_exceptions=True)
+            journal.close(finished=False)
+            raise
+        
+        journal.close(finished=success_count == total_markers)
+        if manifest is not None:
+            self._update_manifest(manifest, markers, names, written, settings)
@@ -1,18 +1,28 @@
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                            QPushButton, QLabel, QFileDialog, QComboBox, QMessageBox,
-                           QTextEdit, QRadioButton, QHBoxLayout, QGridLayout,
-                           QFrame, QSizePolicy, QProgressBar, QLineEdit)
-from PyQt5.QtCore import Qt, pyqtSignal, QTimer
+                           QRadioButton, QHBoxLayout, QGridLayout,
+                           QFrame, QSizePolicy, QProgressBar, QLineEdit, QCheckBox,
+                           QTableView, QHeaderView, QAbstractItemView, QListView, QTabWidget,
+                           QListWidget, QListWidgetItem)
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QThread, QEvent, QSize, QFileSystemWatcher
 from PyQt5.QtGui import QDragEnterEvent, QDropEvent, QFont, QPalette, QColor
 import os
-from fcpxml_parser import FCPXMLParser
-from frame_extractor import FrameExtractor, Resolution
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from fcpxml_parser import FCPXMLParser, Marker, find_fcpxml_files, project_path
+from frame_extractor import FitMode, FrameExtractor, Resolution, merge_projects
+from extraction_profiles import DEFAULT_PROFILE, PROFILES
+from marker_model import MarkerFilterProxyModel, MarkerStatus, MarkerTableModel, MarkerThumbnailModel
+from thumbnail_cache import ThumbnailCache
+from media_cache import MediaCache
 import subprocess
 from PyQt5.QtCore import QStandardPaths
+import threading
 import time
 
 class DropArea(QFrame):
-    fileDropped = pyqtSignal(str)
+    # 拖入的文件和文件夹路径
+    filesDropped = pyqtSignal(list)
 
     def __init__(self):
         super().__init__()
@@ -25,7 +35,7 @@ class DropArea(QFrame):
         layout.setContentsMargins(0, 0, 0, 0)
         
         # 创建标签
-        self.label = QLabel('\n将 FCPXML 文件拖放到这里\n或点击选择文件\n')
+        self.label = QLabel('\n将 FCPXML 文件或文件夹拖放到这里\n或点击选择文件\n')
         self.label.setAlignment(Qt.AlignCenter)
         font = QFont()
         font.setPointSize(13)
@@ -61,9 +71,9 @@ class DropArea(QFrame):
         ''')
 
     def dropEvent(self, event: QDropEvent):
-        files = [url.toLocalFile() for url in event.mimeData().urls()]
+        files = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
         if files:
-            self.fileDropped.emit(files[0])
+            self.filesDropped.emit(files)
             # 保持深色模式下的绿色样式
             if isinstance(self.window(), MainWindow) and self.window().current_theme:
                 self.setStyleSheet('''
@@ -89,23 +99,206 @@ class DropArea(QFrame):
         if isinstance(main_window, MainWindow):
             main_window.select_fcpxml_file()
 
+class ExtractionWorker(QThread):
+    """在后台线程中解析 FCPXML 并取帧，通过信号汇报进度和结果"""
+
+    markers_parsed = pyqtSignal(list)
+    progress = pyqtSignal(int, int, int)
+    # 批量的 (标记点序号, 是否成功)，随进度信号一起节流发送
+    marker_statuses = pyqtSignal(list)
+    # 标记点数, 成功数, 输出目录, 是否已取消
+    succeeded = pyqtSignal(int, int, str, bool)
+    # 错误信息, 是否为警告
+    failed = pyqtSignal(str, bool)
+
+    # 进度信号的最小间隔（秒），避免大量标记点时刷屏
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, projects, output_dir, cache_dir, extractor_options):
+        super().__init__()
+        # [(FCPXML 路径, 已在后台解析好的标记点)]，标记点为 None 时在本线程中解析
+        self.projects = projects
+        self.output_dir = output_dir
+        self.cache_dir = cache_dir
+        self.extractor_options = extractor_options
+        self.extractor = None
+        self._cancelled = False
+        self._last_progress = 0.0
+        self._statuses = []
+        self._status_lock = threading.Lock()
+
+    def cancel(self):
+        """取消任务并结束正在运行的 ffmpeg 子进程"""
+        self._cancelled = True
+        if self.extractor is not None:
+            self.extractor.cancel()
+
+    def report_marker(self, index, ok):
+        # 可能在线程池中调用，先缓存，随进度一起发送
+        with self._status_lock:
+            self._statuses.append((index, ok))
+
+    def flush_statuses(self):
+        with self._status_lock:
+            statuses, self._statuses = self._statuses, []
+        if statuses:
+            self.marker_statuses.emit(statuses)
+
+    def report_progress(self, current, total, success_count):
+        now = time.monotonic()
+        if current == total or now - self._last_progress >= self.PROGRESS_INTERVAL:
+            self._last_progress = now
+            self.flush_statuses()
+            self.progress.emit(current, total, success_count)
+
+    def run(self):
+        try:
+            projects = []
+            for path, project_markers in self.projects:
+                if project_markers is None:
+                    # 解析FCPXML
+                    project_markers = FCPXMLParser(path, cache_dir=self.cache_dir).parse()
+                if project_markers:
+                    projects.append((path, project_markers))
+                else:
+                    print(f"未找到任何标记点: {path}")
+            # 多个项目合并为一个任务：同一视频只解码一次，输出按项目分文件夹
+            markers, folders = merge_projects(projects)
+
+            if not markers:
+                self.failed.emit("未找到任何标记点，请检查FCPXML文件是否正确", True)
+                return
+            self.markers_parsed.emit(markers)
+            if self._cancelled:
+                self.succeeded.emit(len(markers), 0, self.output_dir, True)
+                return
+
+            # 确保输出目录存在
+            os.makedirs(self.output_dir, exist_ok=True)
+
+            # 取帧
+            self.extractor = FrameExtractor(self.output_dir, **self.extractor_options)
+            if self._cancelled:
+                self.extractor.cancel()
+            success_count = self.extractor.extract_frames(
+                markers,
+                progress_callback=self.report_progress,
+                open_output_dir=False,
+                marker_callback=self.report_marker,
+                folders=folders
+            )
+            self.flush_statuses()
+            self.succeeded.emit(len(markers), success_count, self.output_dir, self.extractor.cancelled)
+        except Exception as e:
+            self.failed.emit(str(e), False)
+
+
+@dataclass
+class ParsedProject:
+    """后台解析的 FCPXML 结果，file_key 用于判断文件是否已改变"""
+    path: str
+    file_key: tuple
+    markers: List[Marker]
+    videos: List[str] = field(default_factory=list)
+    missing_videos: List[str] = field(default_factory=list)
+
+    def is_current(self, path: str) -> bool:
+        return path == self.path and MediaCache.file_key(path) == self.file_key
+
+
+class ParseWorker(QThread):
+    """选择文件后立即在后台解析 FCPXML 并检查视频文件是否存在"""
+
+    parsed = pyqtSignal(object)
+    # 文件路径, 错误信息
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, fcpxml_path, cache_dir):
+        super().__init__()
+        self.fcpxml_path = fcpxml_path
+        self.cache_dir = cache_dir
+
+    def run(self):
+        try:
+            # 解析前记录文件状态，解析期间文件被改写时结果会在使用前失效
+            file_key = MediaCache.file_key(self.fcpxml_path)
+            if file_key is None:
+                self.failed.emit(self.fcpxml_path, "文件不存在")
+                return
+            markers = FCPXMLParser(self.fcpxml_path, cache_dir=self.cache_dir).parse()
+            videos = list(dict.fromkeys(marker.video_path for marker in markers))
+            missing = [path for path in videos if not os.path.exists(path)]
+            self.parsed.emit(ParsedProject(self.fcpxml_path, file_key, markers, videos, missing))
+        except Exception as e:
+            self.failed.emit(self.fcpxml_path, str(e))
+
+
 class MainWindow(QMainWindow):
+    # 主题后备轮询间隔（毫秒），用于未发送调色板变化事件的系统
+    THEME_POLL_INTERVAL = 60000
+
     def __init__(self):
         super().__init__()
-        self.fcpxml_path = None
+        # 项目队列：按加入顺序排列的 FCPXML 路径，提取时合并为一个任务
+        self.project_paths: List[str] = []
+        self.worker = None
+        # 后台解析结果和正在运行的解析线程
+        self.parsed_projects: Dict[str, ParsedProject] = {}
+        self.parse_errors: Dict[str, str] = {}
+        self.parse_workers = set()
+        # 文件变化后等待重新解析的项目
+        self.reparse_paths = set()
+        # 被取消的任务 (输出目录, 输出根目录, 项目队列)，下次提取时继续写入同一文件夹
+        self.interrupted_job: Optional[Tuple[str, str, tuple]] = None
         self.output_dir = os.path.expanduser("~/Desktop")
         self.is_file_dialog_open = False  # 添加标志位
-        self.init_ui()
+        # 探测结果等缓存的持久化目录
+        self.cache_dir = QStandardPaths.writableLocation(QStandardPaths.CacheLocation) or None
         
-        # 添加系统主题检测和自动切换
-        self.theme_timer = QTimer()
-        self.theme_timer.timeout.connect(self.check_system_theme)
-        self.theme_timer.start(1000)  # 每秒检查一次系统主题
+        # 添加系统主题检测和自动切换：由调色板变化事件触发，低频轮询仅作为后备
         self.current_theme = None
+        self.theme_check_timer = QTimer(self)
+        self.theme_check_timer.setSingleShot(True)
+        self.theme_check_timer.setInterval(200)  # 合并短时间内的多次变化事件
+        self.theme_check_timer.timeout.connect(self.check_system_theme)
+        self.theme_timer = QTimer(self)
+        self.theme_timer.timeout.connect(self.check_system_theme)
+        
+        # FCPXML 被重新导出时自动重新解析
+        self.file_watcher = QFileSystemWatcher(self)
+        self.file_watcher.fileChanged.connect(self.schedule_reparse)
+        self.reparse_timer = QTimer(self)
+        self.reparse_timer.setSingleShot(True)
+        self.reparse_timer.setInterval(300)  # 等待写入完成
+        self.reparse_timer.timeout.connect(self.reparse_changed)
+
+        self.init_ui()
+        self.theme_timer.start(self.THEME_POLL_INTERVAL)
         self.check_system_theme()
 
+    def event(self, event):
+        # 系统切换深色/浅色外观时 Qt 会更新应用调色板（ApplicationPaletteChange 不经过 changeEvent）
+        if event.type() in (QEvent.PaletteChange, QEvent.ApplicationPaletteChange):
+            self.schedule_theme_check()
+        return super().event(event)
+
+    def schedule_theme_check(self):
+        # 提取过程中不检测主题，结束后补查一次
+        if self.worker is None:
+            self.theme_check_timer.start()
+
+    def pause_theme_checks(self, paused):
+        if paused:
+            self.theme_check_timer.stop()
+            self.theme_timer.stop()
+        else:
+            self.theme_timer.start(self.THEME_POLL_INTERVAL)
+            self.schedule_theme_check()
+
     def check_system_theme(self):
         """检查系统主题并在需要时切换"""
+        if self.worker is not None:
+            return
         try:
             # macOS 检测深色模式的命令
             result = subprocess.run([
@@ -155,7 +348,7 @@ class MainWindow(QMainWindow):
                 }
                 
                 /* 文本编辑器样式 */
-                QTextEdit {
+                QTextEdit, QTableView, QListView, QListWidget {
                     background-color: #2D2D2D;
                     color: #E0E0E0;
                     border: 1px solid #3D3D3D;
@@ -163,6 +356,18 @@ class MainWindow(QMainWindow):
                     selection-background-color: #007AFF;
                     selection-color: #FFFFFF;
                 }
+
+                QTableView {
+                    gridline-color: #3D3D3D;
+                    alternate-background-color: #333333;
+                }
+
+                QHeaderView::section {
+                    background-color: #3D3D3D;
+                    color: #E0E0E0;
+                    border: none;
+                    padding: 3px 6px;
+                }
                 
                 /* 按钮样式 */
                 QPushButton {
@@ -342,7 +547,7 @@ class MainWindow(QMainWindow):
                 }
                 
                 /* 文本编辑器样式 */
-                QTextEdit {
+                QTextEdit, QTableView, QListView, QListWidget {
                     background-color: #FFFFFF;
                     color: #333333;
                     border: 1px solid #E0E0E0;
@@ -350,6 +555,18 @@ class MainWindow(QMainWindow):
                     selection-background-color: #2196F3;
                     selection-color: #FFFFFF;
                 }
+
+                QTableView {
+                    gridline-color: #E0E0E0;
+                    alternate-background-color: #F7F7F7;
+                }
+
+                QHeaderView::section {
+                    background-color: #F0F0F0;
+                    color: #333333;
+                    border: none;
+                    padding: 3px 6px;
+                }
                 
                 QTextEdit:focus {
                     border: 1px solid #2196F3;
@@ -544,7 +761,7 @@ class MainWindow(QMainWindow):
         # 拖放区域
         self.drop_area = DropArea()
         layout.addWidget(self.drop_area)
-        self.drop_area.fileDropped.connect(self.handle_file_selected)
+        self.drop_area.filesDropped.connect(self.handle_files_selected)
 
         # 文件信息显示
         file_info = QFrame()
@@ -555,12 +772,30 @@ class MainWindow(QMainWindow):
         self.file_path_label = QLabel('未选择文件')
         browse_btn = QPushButton('浏览')
         browse_btn.clicked.connect(self.select_fcpxml_file)
+        folder_btn = QPushButton('添加文件夹')
+        folder_btn.clicked.connect(self.select_fcpxml_folder)
+        self.remove_project_btn = QPushButton('移除')
+        self.remove_project_btn.clicked.connect(self.remove_selected_projects)
+        clear_btn = QPushButton('清空')
+        clear_btn.clicked.connect(self.clear_projects)
         
-        file_layout.addWidget(QLabel('当前文件:'))
+        file_layout.addWidget(QLabel('项目队列:'))
         file_layout.addWidget(self.file_path_label, 1)
+        self.project_info_label = QLabel('')
+        file_layout.addWidget(self.project_info_label)
         file_layout.addWidget(browse_btn)
+        file_layout.addWidget(folder_btn)
+        file_layout.addWidget(self.remove_project_btn)
+        file_layout.addWidget(clear_btn)
         layout.addWidget(file_info)
 
+        # 队列中的项目及其解析结果
+        self.project_list = QListWidget()
+        self.project_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.project_list.setMaximumHeight(90)
+        self.project_list.hide()
+        layout.addWidget(self.project_list)
+
         # 输出目录选择
         output_frame = QFrame()
         output_frame.setObjectName('darkFrame')  # 添加对象名以便样式表识别
@@ -607,6 +842,11 @@ class MainWindow(QMainWindow):
         resolution_layout.addWidget(self.ultra_radio)
         resolution_layout.addWidget(self.high_radio)
         resolution_layout.addWidget(self.low_radio)
+        # 源视频小于所选分辨率时保持原尺寸，不做无意义的放大
+        self.no_upscale_check = QCheckBox('不放大')
+        self.no_upscale_check.setToolTip('源视频小于所选分辨率时按原尺寸输出')
+        self.no_upscale_check.setChecked(True)
+        resolution_layout.addWidget(self.no_upscale_check)
         resolution_layout.addStretch()
         layout.addWidget(resolution_frame)
 
@@ -616,14 +856,18 @@ class MainWindow(QMainWindow):
         quality_layout = QHBoxLayout(quality_frame)
         quality_layout.setContentsMargins(8, 4, 8, 4)
         
-        quality_label = QLabel('图片质量:')
-        self.high_quality_radio = QRadioButton('高质量 (处理较慢)')
-        self.normal_quality_radio = QRadioButton('标准质量 (处理较快)')
-        self.high_quality_radio.setChecked(True)  # 默认选择高质量
-        
+        quality_label = QLabel('提取配置:')
         quality_layout.addWidget(quality_label)
-        quality_layout.addWidget(self.high_quality_radio)
-        quality_layout.addWidget(self.normal_quality_radio)
+        # 每个提取配置一个选项，从快到慢排列
+        self.profile_radios = {}
+        for profile in PROFILES.values():
+            radio = QRadioButton(profile.label)
+            radio.setToolTip(
+                f"缩放: {profile.scaler}，锐化: {profile.sharpen or '无'}，质量: {profile.quality}"
+            )
+            self.profile_radios[profile.name] = radio
+            quality_layout.addWidget(radio)
+        self.profile_radios[DEFAULT_PROFILE].setChecked(True)
         quality_layout.addStretch()
         layout.addWidget(quality_frame)
 
@@ -633,11 +877,56 @@ class MainWindow(QMainWindow):
         markers_layout = QVBoxLayout(markers_frame)
         markers_layout.setContentsMargins(8, 4, 8, 4)
         
-        markers_layout.addWidget(QLabel('标记点列表:'))
-        self.markers_text = QTextEdit()
-        self.markers_text.setReadOnly(True)
-        self.markers_text.setStyleSheet('')  # 删除原有的样式设置
-        markers_layout.addWidget(self.markers_text)
+        markers_header = QHBoxLayout()
+        markers_header.addWidget(QLabel('标记点列表:'))
+        self.markers_count_label = QLabel('')
+        markers_header.addWidget(self.markers_count_label)
+        markers_header.addStretch()
+        self.markers_filter = QLineEdit()
+        self.markers_filter.setPlaceholderText('筛选名称或视频')
+        self.markers_filter.setClearButtonEnabled(True)
+        self.markers_filter.textChanged.connect(self.filter_markers)
+        markers_header.addWidget(self.markers_filter)
+        markers_layout.addLayout(markers_header)
+
+        # 表格只绘制可见行，数千个标记点也不会卡顿
+        self.markers_model = MarkerTableModel(self)
+        self.markers_proxy = MarkerFilterProxyModel(self)
+        self.markers_proxy.setSourceModel(self.markers_model)
+        self.markers_table = QTableView()
+        self.markers_table.setModel(self.markers_proxy)
+        self.markers_table.setSortingEnabled(True)
+        self.markers_table.sortByColumn(MarkerTableModel.TIMELINE, Qt.AscendingOrder)
+        self.markers_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.markers_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.markers_table.setWordWrap(False)
+        self.markers_table.setAlternatingRowColors(True)
+        self.markers_table.verticalHeader().hide()
+        # 固定行高，避免按内容逐行计算高度
+        self.markers_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.markers_table.verticalHeader().setDefaultSectionSize(22)
+        self.markers_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.markers_table.horizontalHeader().setSectionResizeMode(MarkerTableModel.VIDEO, QHeaderView.Stretch)
+
+        # 缩略图网格与表格共用筛选和排序，只为可见项在后台解码低分辨率预览
+        self.thumbnail_model = MarkerThumbnailModel(ThumbnailCache(self.cache_dir), self)
+        self.thumbnail_model.setSourceModel(self.markers_proxy)
+        thumbnail_size = self.thumbnail_model.cache.size
+        self.thumbnail_view = QListView()
+        self.thumbnail_view.setModel(self.thumbnail_model)
+        self.thumbnail_view.setModelColumn(MarkerTableModel.NAME)
+        self.thumbnail_view.setViewMode(QListView.IconMode)
+        self.thumbnail_view.setResizeMode(QListView.Adjust)
+        self.thumbnail_view.setMovement(QListView.Static)
+        self.thumbnail_view.setUniformItemSizes(True)
+        self.thumbnail_view.setIconSize(QSize(thumbnail_size, thumbnail_size))
+        self.thumbnail_view.setGridSize(QSize(thumbnail_size + 16, thumbnail_size + 24))
+        self.thumbnail_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+
+        self.markers_tabs = QTabWidget()
+        self.markers_tabs.addTab(self.markers_table, '列表')
+        self.markers_tabs.addTab(self.thumbnail_view, '缩略图')
+        markers_layout.addWidget(self.markers_tabs)
         layout.addWidget(markers_frame)
 
         # 添加进度条区域（移到提取按钮之前）
@@ -697,6 +986,12 @@ class MainWindow(QMainWindow):
         self.extract_btn.setEnabled(False)
         bottom_layout.addWidget(self.extract_btn, alignment=Qt.AlignCenter)
         
+        # 取消按钮，仅在提取过程中显示
+        self.cancel_btn = QPushButton('取消')
+        self.cancel_btn.clicked.connect(self.cancel_extraction)
+        self.cancel_btn.hide()
+        bottom_layout.addWidget(self.cancel_btn, alignment=Qt.AlignCenter)
+        
         # 态标签
         self.status_label = QLabel('准备就绪')
         self.status_label.setAlignment(Qt.AlignCenter)
@@ -705,22 +1000,40 @@ class MainWindow(QMainWindow):
         layout.addWidget(bottom_frame)
 
     def select_fcpxml_file(self):
-        """选择 FCPXML 文件，使用 AppleScript 调用系统访达"""
+        """选择 FCPXML 文件（可多选），使用 AppleScript 调用系统访达"""
+        self.choose_projects('''
+                    set theFiles to choose file ¬
+                        with prompt "选择 FCPXML 文件" ¬
+                        of type {"fcpxml", "xml"} ¬
+                        with multiple selections allowed
+''', "文件选择失败")
+
+    def select_fcpxml_folder(self):
+        """选择包含 FCPXML 文件的文件夹，其中的项目全部加入队列"""
+        self.choose_projects('''
+                    set theFiles to choose folder ¬
+                        with prompt "选择包含 FCPXML 文件的文件夹" ¬
+                        with multiple selections allowed
+''', "文件夹选择失败")
+
+    def choose_projects(self, choose_command, error_title):
         if self.is_file_dialog_open:  # 检查是否已有对话框打开
             return
             
         try:
             self.is_file_dialog_open = True  # 设置标志位
             
-            script = '''
+            script = f'''
             tell application "System Events"
                 tell process "Finder"
                     activate
                     delay 0.1
-                    set theFile to choose file ¬
-                        with prompt "选择 FCPXML 文件" ¬
-                        of type {"fcpxml", "xml"}
-                    return POSIX path of theFile
+{choose_command}
+                    set thePaths to ""
+                    repeat with theFile in theFiles
+                        set thePaths to thePaths & POSIX path of theFile & linefeed
+                    end repeat
+                    return thePaths
                 end tell
             end tell
             '''
@@ -731,12 +1044,12 @@ class MainWindow(QMainWindow):
                                   encoding='utf-8')
             
             if result.returncode == 0:
-                file_path = result.stdout.strip()
-                if file_path and os.path.exists(file_path):
-                    self.handle_file_selected(file_path)
+                paths = [path for path in result.stdout.splitlines() if path and os.path.exists(path)]
+                if paths:
+                    self.handle_files_selected(paths)
                     
         except Exception as e:
-            QMessageBox.critical(self, "错误", f"文件选择失败：{str(e)}")
+            QMessageBox.critical(self, "错误", f"{error_title}：{str(e)}")
         finally:
             self.is_file_dialog_open = False  # 重置标志位
 
@@ -778,119 +1091,319 @@ class MainWindow(QMainWindow):
             self.is_file_dialog_open = False  # 重置标志位
 
     def handle_file_selected(self, file_path):
-        if file_path.lower().endswith('.fcpxml'):
-            self.fcpxml_path = file_path
-            self.drop_area.label.setText(f'已选择文件：\n{os.path.basename(file_path)}')
-            self.file_path_label.setText(os.path.basename(file_path))
-            self.update_extract_button()
+        self.handle_files_selected([file_path])
+
+    def handle_files_selected(self, paths):
+        """将文件和文件夹中的 FCPXML 加入项目队列，并立即在后台解析"""
+        files = find_fcpxml_files(paths)
+        if not files:
+            QMessageBox.warning(self, "错误", "请选择有效的FCPXML文件或包含FCPXML文件的文件夹")
+            return
+        added = [path for path in files if path not in self.project_paths]
+        for path in added:
+            self.project_paths.append(path)
+            self.file_watcher.addPath(path)
+            self.start_parse(path)
+        self.update_project_queue()
+        self.update_extract_button()
+
+    def remove_selected_projects(self):
+        rows = sorted({index.row() for index in self.project_list.selectedIndexes()}, reverse=True)
+        if not rows or self.worker is not None:
+            return
+        for row in rows:
+            self.remove_project(self.project_paths[row])
+        self.refresh_markers()
+
+    def clear_projects(self):
+        if self.worker is not None:
+            return
+        for path in list(self.project_paths):
+            self.remove_project(path)
+        self.refresh_markers()
+
+    def remove_project(self, path):
+        self.project_paths.remove(path)
+        self.parsed_projects.pop(path, None)
+        self.parse_errors.pop(path, None)
+        self.reparse_paths.discard(path)
+        if path in self.file_watcher.files():
+            self.file_watcher.removePath(path)
+
+    def schedule_reparse(self, path):
+        if path not in self.project_paths:
+            return
+        # 部分编辑器以替换文件的方式保存，监视会被移除，需要重新添加
+        if path not in self.file_watcher.files() and os.path.exists(path):
+            self.file_watcher.addPath(path)
+        self.reparse_paths.add(path)
+        self.reparse_timer.start()
+
+    def reparse_changed(self):
+        # 提取过程中文件发生变化，结束后再解析
+        if self.worker is not None:
+            return
+        paths, self.reparse_paths = self.reparse_paths, set()
+        for path in paths:
+            if path in self.project_paths:
+                self.start_parse(path)
+        self.update_project_queue()
+
+    def start_parse(self, path):
+        """在后台解析项目，提取时直接使用解析结果"""
+        self.parsed_projects.pop(path, None)
+        self.parse_errors.pop(path, None)
+        worker = ParseWorker(path, self.cache_dir)
+        worker.parsed.connect(self.project_parsed)
+        worker.failed.connect(self.project_parse_failed)
+        worker.finished.connect(lambda: self.parse_workers.discard(worker))
+        self.parse_workers.add(worker)
+        worker.start()
+
+    def project_parsed(self, project):
+        # 解析期间项目已被移除时丢弃结果
+        if project.path not in self.project_paths:
+            return
+        self.parsed_projects[project.path] = project
+        if self.worker is not None:
+            # 提取进行中只保存结果并更新队列，表格继续显示本次任务的标记点和状态
+            self.update_project_queue()
+            return
+        self.refresh_markers()
+
+    def project_parse_failed(self, path, message):
+        if path not in self.project_paths:
+            return
+        self.parsed_projects.pop(path, None)
+        self.parse_errors[path] = message
+        self.update_project_queue()
+
+    def refresh_markers(self):
+        """按队列顺序合并已解析项目的标记点并显示"""
+        projects = [self.parsed_projects[path] for path in self.project_paths if path in self.parsed_projects]
+        markers = [marker for project in projects for marker in project.markers]
+        self.show_markers(markers, MarkerStatus.NONE)
+        self.markers_model.mark_missing(
+            [video for project in projects for video in project.missing_videos])
+        self.update_project_queue()
+        self.update_extract_button()
+
+    def update_project_queue(self):
+        """更新队列列表和汇总信息"""
+        errors = self.parse_errors
+        self.project_list.clear()
+        videos, missing, marker_count = set(), set(), 0
+        for path in self.project_paths:
+            project = self.parsed_projects.get(path)
+            name = os.path.basename(project_path(path))
+            if project is None:
+                text = f'{name}  — {"解析失败" if path in errors else "正在解析..."}'
+            else:
+                text = f'{name}  — {len(project.markers)} 个标记点，{len(project.videos)} 个视频'
+                if project.missing_videos:
+                    text += f'，{len(project.missing_videos)} 个缺失'
+                videos.update(project.videos)
+                missing.update(project.missing_videos)
+                marker_count += len(project.markers)
+            item = QListWidgetItem(text)
+            item.setToolTip(errors.get(path) or path)
+            self.project_list.addItem(item)
+        self.project_list.setVisible(len(self.project_paths) > 1)
+
+        if not self.project_paths:
+            self.file_path_label.setText('未选择文件')
+            self.drop_area.label.setText('\n将 FCPXML 文件或文件夹拖放到这里\n或点击选择文件\n')
+            self.project_info_label.setText('')
+            self.project_info_label.setToolTip('')
+            return
+        if len(self.project_paths) == 1:
+            name = os.path.basename(project_path(self.project_paths[0]))
+            self.file_path_label.setText(name)
+            self.drop_area.label.setText(f'已选择文件：\n{name}')
         else:
-            QMessageBox.warning(self, "错误", "请选择有效的FCPXML文件")
+            self.file_path_label.setText(f'{len(self.project_paths)} 个项目')
+            self.drop_area.label.setText(f'已选择 {len(self.project_paths)} 个项目\n（同一视频只解码一次，按项目分文件夹输出）')
+
+        pending = sum(1 for path in self.project_paths if path not in self.parsed_projects)
+        if pending and all(path in errors for path in self.project_paths):
+            info = '解析失败'
+        else:
+            info = f'{marker_count} 个标记点，{len(videos)} 个视频'
+            if missing:
+                info += f'，{len(missing)} 个缺失'
+            if any(path in errors for path in self.project_paths):
+                info += '，部分项目解析失败'
+            elif pending:
+                info += '（正在解析...）'
+        self.project_info_label.setText(info)
+        self.project_info_label.setToolTip('缺失的视频:\n' + '\n'.join(sorted(missing)) if missing else '')
 
     def update_extract_button(self):
-        self.extract_btn.setEnabled(bool(self.fcpxml_path and self.output_dir))
+        self.extract_btn.setEnabled(bool(self.project_paths and self.output_dir) and self.worker is None)
+
+    def selected_profile(self) -> str:
+        for name, radio in self.profile_radios.items():
+            if radio.isChecked():
+                return name
+        return DEFAULT_PROFILE
 
     def update_progress(self, current, total, success_count):
         """更新进度条和标签"""
         percentage = int((current / total) * 100)
         self.progress_bar.setValue(percentage)
         self.progress_label.setText(f"正在导出: {current}/{total} (成功: {success_count})")
-        QApplication.processEvents()  # 确保UI更新
 
     def extract_frames(self):
-        try:
-            # 在开始提取之前显示进度条
-            self.progress_bar.setValue(0)
-            self.progress_bar.show()
-            self.progress_label.show()
-            self.extract_btn.setEnabled(False)
-            QApplication.processEvents()  # 确保UI更新
+        if self.worker is not None:
+            return
+            
+        # 设置分辨率
+        if self.ultra_radio.isChecked():
+            resolution = Resolution.ULTRA_LANDSCAPE
+        elif self.high_radio.isChecked():
+            resolution = Resolution.HIGH_LANDSCAPE
+        else:
+            resolution = Resolution.LOW_LANDSCAPE
 
-            # 解析FCPXML
-            parser = FCPXMLParser(self.fcpxml_path)
-            markers = parser.parse()
+        # 获取用户自定义的文件夹名称
+        custom_folder_name = self.folder_name_input.text().strip()
+        
+        # 创建输出目录（使用自定义名称或时间戳）；上次同一任务被取消时继续写入原文件夹，
+        # 增量清单会跳过已完成的帧
+        if custom_folder_name:
+            output_dir = os.path.join(self.output_dir, custom_folder_name)
+        elif (self.interrupted_job is not None
+                and self.interrupted_job[1:] == (self.output_dir, tuple(self.project_paths))):
+            output_dir = self.interrupted_job[0]
+        else:
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            output_dir = os.path.join(self.output_dir, timestamp)
 
-            if not markers:
-                self.progress_bar.hide()
-                self.progress_label.hide()
-                self.extract_btn.setEnabled(True)
-                self.markers_text.setText("未找到标记点")
-                QMessageBox.warning(self, "警告", "未找到任何标记点，请检查FCPXML文件是否正确")
-                return
+        extractor_options = dict(
+            resolution=resolution,
+            profile=self.selected_profile(),
+            fit=FitMode.NO_UPSCALE if self.no_upscale_check.isChecked() else FitMode.TIER,
+            batch_by_video=True,
+            cache_dir=self.cache_dir,
+            max_workers=min(8, os.cpu_count() or 1),
+            incremental=True,
+            # 只有自定义文件夹会在之后的运行中再次使用，任务日志才有意义
+            resume=bool(custom_folder_name),
+            use_keyframe_index=True
+        )
 
-            # 显示标记点信息
-            self.markers_text.clear()
-            for marker in markers:
-                self.markers_text.append(
-                    f"名称: {marker.name}\n"
-                    f"时间: {marker.timestamp:.3f}秒\n"
-                    f"帧号: {marker.frame_id}\n"
-                    f"视频: {os.path.basename(marker.video_path)}\n"
-                    f"------------------------"
-                )
-
-            # 设置分辨率
-            if self.ultra_radio.isChecked():
-                resolution = Resolution.ULTRA_LANDSCAPE
-            elif self.high_radio.isChecked():
-                resolution = Resolution.HIGH_LANDSCAPE
-            else:
-                resolution = Resolution.LOW_LANDSCAPE
+        # 在开始提取之前显示进度条
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.progress_label.setText('正在解析 FCPXML...')
+        self.progress_label.show()
+        self.extract_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.cancel_btn.show()
 
-            # 获取用户自定义的文件夹名称
-            custom_folder_name = self.folder_name_input.text().strip()
-            
-            # 创建输出目录（使用自定义名称或时间戳）
-            if custom_folder_name:
-                output_dir = os.path.join(self.output_dir, custom_folder_name)
-            else:
-                timestamp = time.strftime("%Y%m%d_%H%M%S")
-                output_dir = os.path.join(self.output_dir, timestamp)
+        # 解析和取帧在后台线程中进行，界面保持响应
+        # 文件未改变的项目复用后台解析结果，不再重复解析
+        projects: List[Tuple[str, Optional[List[Marker]]]] = []
+        for path in self.project_paths:
+            project = self.parsed_projects.get(path)
+            projects.append((path, project.markers if project is not None and project.is_current(path) else None))
+        self.worker = ExtractionWorker(projects, output_dir, self.cache_dir, extractor_options)
+        self.worker.markers_parsed.connect(self.show_markers)
+        self.worker.progress.connect(self.update_progress)
+        self.worker.marker_statuses.connect(self.markers_model.set_statuses)
+        self.worker.succeeded.connect(self.extraction_finished)
+        self.worker.failed.connect(self.extraction_failed)
+        self.worker.finished.connect(self.worker_stopped)
+        self.pause_theme_checks(True)
+        self.worker.start()
 
-            # 确保输出目录存在
-            os.makedirs(output_dir, exist_ok=True)
+    def cancel_extraction(self):
+        if self.worker is not None:
+            self.cancel_btn.setEnabled(False)
+            self.progress_label.setText('正在取消...')
+            self.worker.cancel()
 
-            # 取帧
-            extractor = FrameExtractor(
-                output_dir,  # 使用新的输出目录
-                resolution=resolution,
-                high_quality=self.high_quality_radio.isChecked()
-            )
-            success_count = extractor.extract_frames(
-                markers, 
-                progress_callback=self.update_progress
-            )
+    def show_markers(self, markers, status=MarkerStatus.PENDING):
+        # 显示标记点信息，提取中的状态由 marker_statuses 信号更新
+        if markers is not self.markers_model.markers():
+            self.markers_model.set_markers(markers)
+        self.markers_model.reset_status(status)
+        self.update_markers_count()
 
-            # 隐藏进度条和标签
-            self.progress_bar.hide()
-            self.progress_label.hide()
-            self.extract_btn.setEnabled(True)
-
-            # 使用访达打开输出目录
-            try:
-                script = f'''
-                tell application "System Events"
-                    tell application "Finder"
-                        open POSIX file "{output_dir}"
-                        activate
-                    end tell
-                end tell
-                '''
-                subprocess.run(['osascript', '-e', script])
-            except Exception as e:
-                print(f"打开输出目录失败: {str(e)}")
-
-            # 显示结果
-            QMessageBox.information(self, "完成", 
-                f"处理完成！\n"
-                f"- 标记点: {len(markers)} 个\n"
-                f"- 已保存图像: {success_count} 个\n"
-                f"- 输出目录: {output_dir}")
+    def filter_markers(self, text):
+        self.markers_proxy.set_filter_text(text)
+        self.update_markers_count()
 
+    def update_markers_count(self):
+        total = self.markers_model.rowCount()
+        shown = self.markers_proxy.rowCount()
+        self.markers_count_label.setText(f'{shown} / {total}' if shown != total else f'{total} 个')
+
+    def reset_progress(self):
+        # 隐藏进度条和标签
+        self.progress_bar.hide()
+        self.progress_label.hide()
+        self.cancel_btn.hide()
+        self.update_extract_button()
+
+    def worker_stopped(self):
+        self.worker = None
+        self.reset_progress()
+        self.pause_theme_checks(False)
+        if self.reparse_paths:
+            self.reparse_changed()
+
+    def extraction_finished(self, marker_count, success_count, output_dir, cancelled):
+        self.reset_progress()
+        
+        if cancelled:
+            self.interrupted_job = (output_dir, self.output_dir, tuple(self.project_paths))
+            QMessageBox.information(self, "已取消",
+                f"提取已取消。\n"
+                f"- 已保存图像: {success_count} / {marker_count} 个\n"
+                f"- 项目和输出目录不变时，再次提取将继续写入 {os.path.basename(output_dir)} 并跳过已完成的帧")
+            return
+        self.interrupted_job = None
+
+        # 使用访达打开输出目录
+        try:
+            script = f'''
+            tell application "System Events"
+                tell application "Finder"
+                    open POSIX file "{output_dir}"
+                    activate
+                end tell
+            end tell
+            '''
+            subprocess.run(['osascript', '-e', script])
         except Exception as e:
-            self.progress_bar.hide()
-            self.progress_label.hide()
-            self.extract_btn.setEnabled(True)
-            QMessageBox.critical(self, "错误", f"处理过程中出现错误：{str(e)}")
+            print(f"打开输出目录失败: {str(e)}")
+
+        # 显示结果
+        QMessageBox.information(self, "完成", 
+            f"处理完成！\n"
+            f"- 标记点: {marker_count} 个\n"
+            f"- 已保存图像: {success_count} 个\n"
+            f"- 输出目录: {output_dir}")
+
+    def extraction_failed(self, message, is_warning):
+        self.reset_progress()
+        if is_warning:
+            self.markers_model.set_markers([])
+            self.markers_count_label.setText('未找到标记点')
+            QMessageBox.warning(self, "警告", message)
+        else:
+            QMessageBox.critical(self, "错误", f"处理过程中出现错误：{message}")
+
+    def closeEvent(self, event):
+        self.thumbnail_model.stop()
+        for worker in list(self.parse_workers):
+            worker.wait()
+        # 关闭窗口时结束正在运行的 ffmpeg 进程
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        super().closeEvent(event)
 
 def main():
     import sys
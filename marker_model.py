@@ -0,0 +1,305 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from PyQt5.QtCore import (Qt, QAbstractTableModel, QIdentityProxyModel, QModelIndex, QObject,
+                          QPersistentModelIndex, QSortFilterProxyModel, QVariant, pyqtSignal)
+from PyQt5.QtGui import QColor, QPixmap, QPixmapCache
+from fcpxml_parser import Marker
+from thumbnail_cache import ThumbnailCache
+
+
+class MarkerStatus:
+    """标记点的提取状态"""
+    NONE = 0
+    PENDING = 1
+    DONE = 2
+    FAILED = 3
+    MISSING = 4
+
+    LABELS = {NONE: '', PENDING: '等待中', DONE: '完成', FAILED: '失败', MISSING: '缺少媒体'}
+    COLORS = {DONE: QColor('#4CAF50'), FAILED: QColor('#F44336'), MISSING: QColor('#FF9800')}
+
+
+class MarkerTableModel(QAbstractTableModel):
+    """标记点表格模型，直接引用解析结果，视图只为可见行请求数据"""
+
+    NAME, TIMELINE, TIME, TIMECODE, FRAME, VIDEO, STATUS = range(7)
+    HEADERS = ['名称', '时间线 (秒)', '素材时间 (秒)', '时码', '帧号', '视频', '状态']
+
+    # 排序使用的角色：数值列按数值排序
+    SortRole = Qt.UserRole
+    # 返回 Marker 对象，可穿过代理模型取得原始标记点
+    MarkerRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._markers: List[Marker] = []
+        self._video_names: List[str] = []
+        self._status: List[int] = []
+
+    def set_markers(self, markers: List[Marker]):
+        self.beginResetModel()
+        self._markers = markers
+        # 视频文件名按路径缓存，避免每次绘制都调用 basename
+        names = {}
+        self._video_names = [
+            names.setdefault(marker.video_path, os.path.basename(marker.video_path))
+            for marker in self._markers
+        ]
+        self._status = [MarkerStatus.NONE] * len(self._markers)
+        self.endResetModel()
+
+    def markers(self) -> List[Marker]:
+        return self._markers
+
+    def marker(self, row: int) -> Optional[Marker]:
+        if 0 <= row < len(self._markers):
+            return self._markers[row]
+        return None
+
+    def reset_status(self, status: int = MarkerStatus.PENDING):
+        """将所有标记点设为同一状态（如开始提取时设为等待中）"""
+        if not self._markers:
+            return
+        self._status = [status] * len(self._markers)
+        self._status_changed(0, len(self._markers) - 1)
+
+    def mark_missing(self, video_paths):
+        """将引用缺失视频的标记点标为缺少媒体"""
+        missing = set(video_paths)
+        if not missing or not self._markers:
+            return
+        for row, marker in enumerate(self._markers):
+            if marker.video_path in missing:
+                self._status[row] = MarkerStatus.MISSING
+        self._status_changed(0, len(self._markers) - 1)
+
+    def set_statuses(self, updates: List[Tuple[int, bool]]):
+        """批量更新提取结果 (行号, 是否成功)"""
+        if not updates:
+            return
+        for row, ok in updates:
+            self._status[row] = MarkerStatus.DONE if ok else MarkerStatus.FAILED
+        rows = [row for row, _ in updates]
+        self._status_changed(min(rows), max(rows))
+
+    def _status_changed(self, first: int, last: int):
+        self.dataChanged.emit(self.index(first, self.STATUS), self.index(last, self.STATUS),
+                              [Qt.DisplayRole, Qt.ForegroundRole, self.SortRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._markers)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return QVariant()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        row, column = index.row(), index.column()
+        marker = self._markers[row]
+
+        if role == self.MarkerRole:
+            return marker
+        if role == Qt.DisplayRole:
+            if column == self.NAME:
+                return marker.name
+            if column == self.TIMELINE:
+                return f"{marker.timeline_time:.3f}"
+            if column == self.TIME:
+                return f"{marker.timestamp:.3f}"
+            if column == self.TIMECODE:
+                return marker.timecode
+            if column == self.FRAME:
+                return str(marker.frame_id)
+            if column == self.VIDEO:
+                return self._video_names[row]
+            if column == self.STATUS:
+                return MarkerStatus.LABELS[self._status[row]]
+        elif role == self.SortRole:
+            # 时间线列按文档顺序排序：即各项目内的时间线顺序，合并多个项目时不会交错
+            if column == self.TIMELINE:
+                return row
+            if column in (self.TIME, self.TIMECODE):
+                return marker.timestamp
+            if column == self.FRAME:
+                return marker.frame_id
+            if column == self.STATUS:
+                return self._status[row]
+            return self.data(index, Qt.DisplayRole)
+        elif role == Qt.ToolTipRole and column == self.VIDEO:
+            return marker.video_path
+        elif role == Qt.ForegroundRole and column == self.STATUS:
+            color = MarkerStatus.COLORS.get(self._status[row])
+            if color is not None:
+                return color
+        elif role == Qt.TextAlignmentRole and column in (self.TIMELINE, self.TIME, self.FRAME):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return QVariant()
+
+
+class MarkerFilterProxyModel(QSortFilterProxyModel):
+    """按名称或视频文件名筛选标记点，按数值排序"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(MarkerTableModel.SortRole)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self._text = ''
+
+    def set_filter_text(self, text: str):
+        self._text = text.strip().lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self._text:
+            return True
+        model = self.sourceModel()
+        marker = model.marker(source_row)
+        return (self._text in marker.name.lower()
+                or self._text in os.path.basename(marker.video_path).lower())
+
+
+class ThumbnailLoader(QObject):
+    """后台解码缩略图
+
+    待处理请求按后进先出处理并限制数量，快速滚动时优先解码当前可见的标记点，
+    早已滚出视野的请求会被丢弃。
+    """
+
+    # 缓存键
+    loaded = pyqtSignal(object)
+
+    def __init__(self, cache: ThumbnailCache, workers: int = 2, max_pending: int = 64, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.max_pending = max_pending
+        self._worker_count = workers
+        self._pending: 'OrderedDict[tuple, Marker]' = OrderedDict()
+        self._in_flight = set()
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopped = False
+
+    def request(self, key: tuple, marker: Marker):
+        with self._condition:
+            if self._stopped or key in self._in_flight:
+                return
+            self._pending[key] = marker
+            self._pending.move_to_end(key)
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+            if not self._threads:
+                for _ in range(self._worker_count):
+                    thread = threading.Thread(target=self._work, daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+            self._condition.notify()
+
+    def clear(self):
+        """丢弃尚未开始的请求"""
+        with self._condition:
+            self._pending.clear()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._pending.clear()
+            self._condition.notify_all()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                key, marker = self._pending.popitem(last=True)
+                self._in_flight.add(key)
+            try:
+                self.cache.load(marker, key)
+            finally:
+                with self._condition:
+                    self._in_flight.discard(key)
+            self.loaded.emit(key)
+
+
+class MarkerThumbnailModel(QIdentityProxyModel):
+    """为标记点列表附加缩略图，视图请求到某一项时才排队解码"""
+
+    def __init__(self, cache: ThumbnailCache, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.loader = ThumbnailLoader(cache, parent=self)
+        self.loader.loaded.connect(self._thumbnail_loaded)
+        # 等待解码的缓存键对应的行，解码完成后通知视图刷新
+        self._waiting: Dict[tuple, List[QPersistentModelIndex]] = {}
+        # 按标记点对象缓存的缓存键，避免每次重绘都 stat 视频文件；排序和筛选会移动行，
+        # 因此不能按行号缓存。标记点由源模型持有，模型重置时清空
+        self._keys: Dict[int, Optional[tuple]] = {}
+        self.modelReset.connect(self._reset)
+
+        height = cache.size * 9 // 16
+        self._placeholder = QPixmap(cache.size, height)
+        self._placeholder.fill(QColor('#3D3D3D'))
+        self._unavailable = QPixmap(cache.size, height)
+        self._unavailable.fill(QColor('#8B2E2E'))
+
+    def _reset(self):
+        self.loader.clear()
+        self._waiting.clear()
+        self._keys.clear()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role not in (Qt.DecorationRole, Qt.ToolTipRole) or not index.isValid():
+            return super().data(index, role)
+        marker = super().data(index, MarkerTableModel.MarkerRole)
+        if marker is None:
+            return QVariant()
+        if role == Qt.ToolTipRole:
+            return f"{marker.name}\n{marker.timecode}\n{os.path.basename(marker.video_path)}"
+        return self._thumbnail(index, marker)
+
+    def _thumbnail(self, index, marker: Marker) -> QPixmap:
+        marker_id = id(marker)
+        if marker_id in self._keys:
+            key = self._keys[marker_id]
+        else:
+            key = self._keys[marker_id] = self.cache.key(marker)
+        if key is None:
+            return self._unavailable
+
+        pixmap_key = repr(key)
+        pixmap = QPixmapCache.find(pixmap_key)
+        if pixmap is not None and not pixmap.isNull():
+            return pixmap
+
+        hit, data = self.cache.cached(key)
+        if hit:
+            pixmap = QPixmap()
+            if not data or not pixmap.loadFromData(data, 'JPG'):
+                return self._unavailable
+            QPixmapCache.insert(pixmap_key, pixmap)
+            return pixmap
+
+        waiting = self._waiting.setdefault(key, [])
+        persistent = QPersistentModelIndex(index)
+        if persistent not in waiting:
+            waiting.append(persistent)
+        self.loader.request(key, marker)
+        return self._placeholder
+
+    def _thumbnail_loaded(self, key):
+        for index in self._waiting.pop(key, []):
+            if index.isValid():
+                model_index = self.index(index.row(), index.column())
+                self.dataChanged.emit(model_index, model_index, [Qt.DecorationRole])
+
+    def stop(self):
+        self.loader.stop()
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+
+class MediaCache:
+    """按文件路径、大小和修改时间缓存媒体信息
+
+    内存层在进程内共享；指定 cache_dir 时额外写入磁盘，可在多次运行和多个项目间复用。
+    文件被替换或修改后（大小或修改时间变化）缓存自动失效。
+    """
+
+    def __init__(self, namespace: str, cache_dir: Optional[str] = None):
+        self.namespace = namespace
+        self.cache_dir = os.path.join(cache_dir, namespace) if cache_dir else None
+        self._memory: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_key(path: str) -> Optional[tuple]:
+        """生成缓存键，文件不存在时返回 None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    def _disk_path(self, key: tuple) -> str:
+        digest = hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, path: str) -> Optional[Any]:
+        """读取缓存，未命中返回 None"""
+        key = self.file_key(path)
+        if key is None:
+            return None
+
+        with self._lock:
+            if key in self._memory:
+                return self._memory[key]
+
+        if not self.cache_dir:
+            return None
+
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if tuple(entry.get('key', ())) != key:
+            return None
+
+        value = entry.get('value')
+        with self._lock:
+            self._memory[key] = value
+        return value
+
+    def put(self, path: str, value: Any):
+        """写入缓存"""
+        key = self.file_key(path)
+        if key is None:
+            return
+
+        with self._lock:
+            self._memory[key] = value
+
+        if not self.cache_dir:
+            return
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            disk_path = self._disk_path(key)
+            tmp_path = f"{disk_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': list(key), 'value': value}, f)
+            # 原子替换，避免并发写入或中途崩溃留下损坏的缓存
+            os.replace(tmp_path, disk_path)
+        except OSError as e:
+            print(f"写入缓存失败: {str(e)}")
+
+    def clear(self):
+        """清空内存层"""
+        with self._lock:
+            self._memory.clear()
+
+
+_caches: Dict[tuple, MediaCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_media_cache(namespace: str, cache_dir: Optional[str] = None) -> MediaCache:
+    """获取共享的缓存实例，同一命名空间和目录只创建一次"""
+    with _caches_lock:
+        key = (namespace, cache_dir)
+        if key not in _caches:
+            _caches[key] = MediaCache(namespace, cache_dir)
+        return _caches[key]
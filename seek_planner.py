@@ -0,0 +1,109 @@
+import bisect
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+from fcpxml_parser import Marker
+
+
+class KeyframeIndex:
+    """视频的关键帧时间表（相对文件起点的秒数），全帧内编码的视频只记录标志"""
+
+    def __init__(self, times: Optional[List[float]] = None, all_intra: bool = False):
+        self.times = sorted(times or [])
+        self.all_intra = all_intra
+
+    def keyframe_before(self, target: float) -> float:
+        """不晚于 target 的最后一个关键帧"""
+        if self.all_intra:
+            return target
+        k = bisect.bisect_right(self.times, target) - 1
+        return self.times[k] if k >= 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {'all_intra': self.all_intra, 'times': [round(t, 6) for t in self.times]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'KeyframeIndex':
+        return cls(data.get('times'), data.get('all_intra', False))
+
+    def __bool__(self):
+        return self.all_intra or bool(self.times)
+
+
+@dataclass
+class DecodeSpan:
+    """一段连续解码：定位一次，然后向前解码依次取出各目标帧"""
+    seek_time: float
+    indices: List[int] = field(default_factory=list)
+
+
+@dataclass
+class VideoPlan:
+    """单个视频的执行计划，spans 按时间排序"""
+    video_path: str
+    spans: List[DecodeSpan] = field(default_factory=list)
+
+    @property
+    def indices(self) -> List[int]:
+        return [i for span in self.spans for i in span.indices]
+
+
+class SeekPlanner:
+    """为每个视频的标记点排序，并决定每个目标是重新定位还是继续向前解码
+
+    有关键帧位置时按代价比较：继续解码需要解码 (t - 上一目标) 秒的画面；
+    重新定位需要从 t 之前的关键帧解码到 t，再加上一次定位的固定开销 seek_cost。
+    若 t 之前的关键帧不晚于上一目标，重新定位不会省下任何解码，总是继续解码。
+    没有关键帧信息时，间隔不超过 forward_decode_limit 秒则继续解码。
+    """
+
+    def __init__(self, forward_decode_limit: float = 2.0, seek_cost: float = 1.0, max_span_outputs: int = 16):
+        self.forward_decode_limit = forward_decode_limit
+        # 一次定位（新的解码过程、刷新解码器）折算成的解码秒数
+        self.seek_cost = seek_cost
+        # 单段最多输出的帧数
+        self.max_span_outputs = max(1, max_span_outputs)
+
+    def _continue_forward(self, position: float, target: float, keyframes: Optional[KeyframeIndex]) -> bool:
+        if not keyframes:
+            return target - position <= self.forward_decode_limit
+
+        keyframe = keyframes.keyframe_before(target)
+        if keyframe <= position:
+            return True
+        return target - position <= (target - keyframe) + self.seek_cost
+
+    def plan_times(self, times: List[float],
+                   keyframes: Union[KeyframeIndex, List[float], None] = None) -> List[DecodeSpan]:
+        """为同一视频的时间点生成解码段，段内索引指向 times"""
+        if isinstance(keyframes, list):
+            keyframes = KeyframeIndex(keyframes)
+        spans = []
+        position = None
+        for index in sorted(range(len(times)), key=lambda i: times[i]):
+            target = times[index]
+            if (position is None
+                    or len(spans[-1].indices) >= self.max_span_outputs
+                    or not self._continue_forward(position, target, keyframes)):
+                spans.append(DecodeSpan(seek_time=target))
+            spans[-1].indices.append(index)
+            position = target
+        return spans
+
+    def plan(self, markers: List[Marker], indices: Optional[List[int]] = None,
+             keyframes: Optional[Dict[str, KeyframeIndex]] = None) -> List[VideoPlan]:
+        """按视频分组并生成执行计划，视频按首次出现的顺序排列"""
+        if indices is None:
+            indices = list(range(len(markers)))
+        keyframes = keyframes or {}
+
+        groups: Dict[str, List[int]] = {}
+        for i in indices:
+            groups.setdefault(markers[i].video_path, []).append(i)
+
+        plans = []
+        for video_path, group in groups.items():
+            spans = self.plan_times([markers[i].seek_time for i in group], keyframes.get(video_path))
+            for span in spans:
+                span.indices = [group[j] for j in span.indices]
+            plans.append(VideoPlan(video_path, spans))
+        return plans
@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import sys
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Optional
+from fcpxml_parser import Marker
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 numpy 时无法使用共享内存帧
+    np = None
+
+
+@dataclass
+class FrameDescriptor:
+    """共享内存中一帧的描述，传给消费进程时只需序列化这几个字段"""
+    marker: Marker
+    shape: tuple
+    dtype: str
+    slot: int
+
+
+class SharedFrameRing:
+    """共享内存帧缓冲环：生产者把帧写入空闲槽位，消费者按描述读取后释放槽位
+
+    所有槽位位于同一块共享内存中，消费进程通过 pickle 传递的环对象连接到同一块内存，
+    读取时得到的是零拷贝视图，不会为每个消费者复制整帧数据。
+    没有空闲槽位时 write 会阻塞，直到消费者调用 release。
+    """
+
+    def __init__(self, slot_count: int, slot_size: int, context=None):
+        if np is None:
+            raise RuntimeError("需要安装 numpy 才能使用共享内存帧")
+        self.slot_count = max(1, slot_count)
+        self.slot_size = slot_size
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_count * slot_size)
+        # fork 出的消费进程继承同一个对象，按进程号判断谁负责删除共享内存
+        self._owner_pid = os.getpid()
+        # 空闲槽位队列，消费者释放后放回
+        self._free = (context or multiprocessing).Queue()
+        for slot in range(self.slot_count):
+            self._free.put(slot)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __getstate__(self):
+        return {
+            'name': self._shm.name,
+            'slot_count': self.slot_count,
+            'slot_size': self.slot_size,
+            'free': self._free,
+        }
+
+    def __setstate__(self, state):
+        self.slot_count = state['slot_count']
+        self.slot_size = state['slot_size']
+        self._free = state['free']
+        self._shm = _attach(state['name'])
+        self._owner_pid = None
+
+    def write(self, marker: Marker, image: 'np.ndarray', timeout: Optional[float] = None) -> FrameDescriptor:
+        """将帧复制到一个空闲槽位，返回其描述；超时未等到空闲槽位时抛出 queue.Empty"""
+        if image.nbytes > self.slot_size:
+            raise ValueError(f"帧大小 {image.nbytes} 超过槽位大小 {self.slot_size}")
+        slot = self._free.get(timeout=timeout)
+        descriptor = FrameDescriptor(marker, tuple(image.shape), image.dtype.str, slot)
+        self.view(descriptor)[...] = image
+        return descriptor
+
+    def view(self, descriptor: FrameDescriptor) -> 'np.ndarray':
+        """槽位中帧数据的零拷贝视图，释放槽位后不可再使用"""
+        return np.ndarray(descriptor.shape, dtype=np.dtype(descriptor.dtype),
+                          buffer=self._shm.buf, offset=descriptor.slot * self.slot_size)
+
+    def release(self, descriptor: FrameDescriptor):
+        """消费者处理完一帧后释放其槽位"""
+        self._free.put(descriptor.slot)
+
+    def close(self):
+        """断开与共享内存的连接；创建者同时删除共享内存"""
+        self._shm.close()
+        if self._owner_pid == os.getpid():
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """连接到已有的共享内存，不在当前进程退出时删除它"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # 3.13 之前连接方也会登记到 resource_tracker；由 multiprocessing 启动的
+    # 消费进程与创建者共用同一个 resource_tracker，不会提前删除
+    return shared_memory.SharedMemory(name=name)
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import subprocess
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from fcpxml_parser import Marker
+from frame_extractor import tool_path
+from media_cache import MediaCache
+
+
+class ThumbnailCache:
+    """标记点预览缩略图缓存
+
+    内存层为按条数限制的 LRU，保存 JPEG 数据；指定 cache_dir 时缩略图同时写入磁盘，
+    以视频路径、大小、修改时间和定位时间为键，视频被替换后自动失效。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, size: int = 160,
+                 memory_limit: int = 512, timeout: float = 20):
+        self.size = size
+        self.memory_limit = memory_limit
+        self.timeout = timeout
+        self.cache_dir = os.path.join(cache_dir, 'thumbnails') if cache_dir else None
+        self.ffmpeg_path = tool_path('ffmpeg')
+        self._memory: 'OrderedDict[tuple, Optional[bytes]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, marker: Marker) -> Optional[tuple]:
+        """缓存键，视频文件不存在时返回 None"""
+        file_key = MediaCache.file_key(marker.video_path)
+        if file_key is None:
+            return None
+        return file_key + (round(marker.seek_time, 6), self.size)
+
+    def _disk_path(self, key: tuple) -> str:
+        digest = hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.jpg")
+
+    def _remember(self, key: tuple, data: Optional[bytes]):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_limit:
+                self._memory.popitem(last=False)
+
+    def cached(self, key: tuple):
+        """仅查询内存层：返回 (是否命中, 数据)，解码失败的条目数据为 None"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return True, self._memory[key]
+        return False, None
+
+    def load(self, marker: Marker, key: Optional[tuple] = None) -> Optional[bytes]:
+        """依次查内存、磁盘，未命中时解码；会阻塞，应在后台线程调用"""
+        key = key or self.key(marker)
+        if key is None:
+            return None
+
+        hit, data = self.cached(key)
+        if hit:
+            return data
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), 'rb') as f:
+                    data = f.read()
+                self._remember(key, data)
+                return data
+            except OSError:
+                pass
+
+        data = self.decode(marker)
+        self._remember(key, data)
+        if data and self.cache_dir:
+            self._write_disk(key, data)
+        return data
+
+    def _write_disk(self, key: tuple, data: bytes):
+        disk_path = self._disk_path(key)
+        tmp_path = f"{disk_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, disk_path)
+        except OSError as e:
+            print(f"写入缩略图缓存失败: {str(e)}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def decode(self, marker: Marker) -> Optional[bytes]:
+        """低成本解码一帧缩略图：单线程、跳过环路滤波、快速缩放，直接输出 JPEG 数据"""
+        size = self.size
+        command = [
+            self.ffmpeg_path, '-v', 'error',
+            '-threads', '1',
+            '-skip_loop_filter', 'all',
+            '-ss', f"{marker.seek_time:.6f}",
+            '-i', marker.video_path,
+            '-an', '-sn', '-dn',
+            '-frames:v', '1',
+            '-vf', f"scale={size}:{size}:force_original_aspect_ratio=decrease:flags=fast_bilinear",
+            '-c:v', 'mjpeg', '-q:v', '5',
+            '-f', 'image2pipe', '-'
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, timeout=self.timeout)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"生成缩略图失败 {marker.name}: {str(e)}")
+            return None
+        if result.returncode != 0 or not result.stdout:
+            return None
+        return result.stdout